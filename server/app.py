@@ -6,6 +6,10 @@ import os
 
 from config import config
 from database import db
+import compression
+import request_cache
+import scheduler
+from json_provider import BSONJSONProvider
 from auth_routes import auth_bp
 from user_routes import user_bp
 from shopping_routes import shopping_bp
@@ -17,6 +21,9 @@ def create_app(config_name=None):
     """Application factory pattern"""
     app = Flask(__name__)
     
+    # Encode ObjectIds natively, with orjson when installed
+    app.json = BSONJSONProvider(app)
+    
     # Load configuration
     config_name = config_name or os.environ.get('FLASK_ENV', 'development')
     app.config.from_object(config[config_name])
@@ -33,6 +40,9 @@ def create_app(config_name=None):
     # Register error handlers
     register_error_handlers(app)
     
+    # Start background maintenance tasks
+    setup_background_tasks(app)
+    
     return app
 
 def setup_extensions(app):
@@ -102,6 +112,9 @@ def setup_extensions(app):
              allow_headers=['Content-Type', 'Authorization', 'X-Requested-With'],
              methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
     
+    # Compress large responses for clients that accept it
+    compression.init_app(app)
+    
     # JWT
     jwt = JWTManager(app)
     
@@ -134,12 +147,56 @@ def setup_extensions(app):
 def setup_database(app):
     """Initialize database connection"""
     try:
-        db.initialize(app.config['MONGO_URI'], app.config['DATABASE_NAME'])
+        db.initialize(
+            app.config['MONGO_URI'],
+            app.config['DATABASE_NAME'],
+            check_query_plans=app.config['CHECK_QUERY_PLANS']
+        )
         app.logger.info("Database initialized successfully")
+        
+        # Sessions expire together with their refresh token
+        from session_manager import SessionManager, TokenBlacklist
+        SessionManager.configure(session_lifetime=app.config['JWT_REFRESH_TOKEN_EXPIRES'])
+        
+        # Warm the token blocklist cache so most checks skip MongoDB
+        TokenBlacklist.configure(
+            refresh_interval=app.config['TOKEN_BLACKLIST_REFRESH_INTERVAL'],
+            cache_ttl=app.config['TOKEN_BLACKLIST_CACHE_TTL']
+        )
+        revoked_count = TokenBlacklist.rebuild_cache()
+        app.logger.info(f"Token blocklist cache loaded with {revoked_count} tokens")
+        
+        from home_models import Home
+        Home.configure(member_cache_ttl=app.config['HOME_MEMBER_CACHE_TTL'])
+        
+        from shopping_models import ShoppingList
+        ShoppingList.configure(item_storage=app.config['SHOPPING_ITEM_STORAGE'])
+        
+        # Lists written before item counters existed get them once
+        backfilled_count = ShoppingList.backfill_item_counts()
+        if backfilled_count:
+            app.logger.info(f"Backfilled item counters for {backfilled_count} shopping lists")
     except Exception as e:
         app.logger.error(f"Database initialization failed: {e}")
         raise
 
+def setup_background_tasks(app):
+    """Schedule periodic maintenance jobs"""
+    from session_manager import reap_expired
+    scheduler.schedule(app, 'expiry-reaper', app.config['EXPIRY_REAPER_INTERVAL'], reap_expired)
+    
+    from shopping_models import StatsRollup
+    reconciler = scheduler.schedule(app, 'stats-reconciler', app.config['STATS_RECONCILE_INTERVAL'], StatsRollup.reconcile)
+    # Build the stats rollups once if they have never been built
+    if StatsRollup.is_empty():
+        reconciler.run_once()
+    
+    # Permission checks read home memberships from memory once loaded
+    from home_models import MembershipCache
+    membership_sync = scheduler.schedule(app, 'membership-sync', app.config['MEMBERSHIP_SYNC_INTERVAL'], MembershipCache.sync)
+    if app.config['MEMBERSHIP_SYNC_INTERVAL'] > 0:
+        membership_sync.run_once()
+
 def register_blueprints(app):
     """Register application blueprints"""
     app.register_blueprint(auth_bp)
@@ -162,6 +219,14 @@ def register_blueprints(app):
             headers['Access-Control-Allow-Credentials'] = 'true'
             return response
     
+    # Expose identity map counters while debugging
+    @app.after_request
+    def add_identity_map_stats(response):
+        if app.config['DEBUG']:
+            stats = request_cache.stats()
+            response.headers['X-Identity-Map'] = f"hits={stats['hits']}; misses={stats['misses']}"
+        return response
+    
     # Health check endpoint
     @app.route('/health')
     def health_check():
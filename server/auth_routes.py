@@ -13,6 +13,7 @@ import uuid
 import json
 import base64
 import urllib.parse
+from datetime import datetime, timezone
 from secrets import token_urlsafe
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -519,15 +520,17 @@ def logout():
         access_jti = jwt_data.get('jti')
         
         # Find and invalidate session
-        sessions = SessionManager.get_user_sessions(current_user_id)
-        for session in sessions:
-            if session.get('access_token_jti') == access_jti:
-                SessionManager.invalidate_session(str(session['_id']))
-                # Blacklist both access and refresh tokens
-                TokenBlacklist.add_token(access_jti, 'access')
-                if session.get('refresh_token_jti'):
-                    TokenBlacklist.add_token(session['refresh_token_jti'], 'refresh')
-                break
+        session = SessionManager.find_by_access_token_jti(access_jti) if access_jti else None
+        if session and session.get('user_id') == current_user_id:
+            SessionManager.invalidate_session(str(session['_id']))
+            # Blacklist both access and refresh tokens until they would expire anyway
+            access_expires_at = datetime.fromtimestamp(jwt_data['exp'], tz=timezone.utc)
+            TokenBlacklist.add_token(access_jti, 'access', access_expires_at)
+            if session.get('refresh_token_jti'):
+                refresh_expires_at = session.get('expires_at') or (
+                    datetime.now(timezone.utc) + current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+                )
+                TokenBlacklist.add_token(session['refresh_token_jti'], 'refresh', refresh_expires_at)
         
         return jsonify({'message': 'Logged out successfully'}), 200
         
@@ -550,14 +553,9 @@ def refresh():
             return jsonify({'message': 'User not found'}), 404
         
         # Find session with this refresh token
-        sessions = SessionManager.get_user_sessions(current_user_id)
-        current_session = None
-        for session in sessions:
-            if session.get('refresh_token_jti') == refresh_jti:
-                current_session = session
-                break
-        
-        if not current_session:
+        current_session = SessionManager.find_by_refresh_token_jti(refresh_jti) if refresh_jti else None
+        
+        if not current_session or current_session.get('user_id') != current_user_id:
             return jsonify({'message': 'Invalid refresh token'}), 401
         
         # Generate new access token with new JTI
@@ -569,7 +567,6 @@ def refresh():
         
         # Update session with new access token JTI
         from database import db
-        from datetime import datetime, timezone
         sessions_collection = db.get_collection('user_sessions')
         sessions_collection.update_one(
             {'_id': current_session['_id']},
@@ -584,7 +581,9 @@ def refresh():
         # Blacklist old access token if it exists
         old_access_jti = current_session.get('access_token_jti')
         if old_access_jti:
-            TokenBlacklist.add_token(old_access_jti, 'access')
+            # The old access token was issued at most one access lifetime ago
+            old_access_expires_at = datetime.now(timezone.utc) + current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+            TokenBlacklist.add_token(old_access_jti, 'access', old_access_expires_at)
         
         return jsonify({
             'access_token': new_access_token,
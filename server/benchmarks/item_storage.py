@@ -0,0 +1,103 @@
+"""
+Compare embedded and collection item storage for shopping lists
+
+Creates lists of 10/100/1000 items in a scratch database and times the
+model operations the API performs on them. Requires a running MongoDB.
+
+Usage:
+    python benchmarks/item_storage.py [--sizes 10,100,1000] [--repeat 50]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+from bson import ObjectId, encode
+
+# Run from the server directory or from benchmarks/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database import db
+from shopping_models import ShoppingList, ITEM_STORAGE_MODES
+
+BENCHMARK_DATABASE = 'shopping_list_benchmark'
+
+
+def make_items(count):
+    """Build items with realistic notes"""
+    return [
+        ShoppingList._new_item(f"Item {index}", index % 5 + 1, 'Groceries', 'Pick the ripe ones, not the green ones. ' * 3)
+        for index in range(count)
+    ]
+
+
+def time_ms(func, repeat):
+    """Median wall time of func in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_case(storage, size, repeat):
+    """Time the common list operations for one storage mode and list size"""
+    ShoppingList.configure(item_storage=storage)
+    user_id = str(ObjectId())
+    # create() logs the whole list document
+    with contextlib.redirect_stdout(io.StringIO()):
+        shopping_list = ShoppingList.create(user_id, f"{storage} {size}", items=make_items(size))
+    list_id = shopping_list.id
+    item_id = shopping_list.data['items'][size // 2]['id']
+
+    stored = db.get_collection('shopping_lists').find_one({'_id': shopping_list.data['_id']})
+    toggle = {'completed': False}
+
+    def toggle_item():
+        toggle['completed'] = not toggle['completed']
+        shopping_list.update_item(item_id, dict(toggle))
+
+    def add_and_remove_item():
+        new_id = str(ObjectId())
+        shopping_list.apply_item_ops([{'op': 'add', 'item': {'id': new_id, 'name': 'Extra'}}])
+        shopping_list.apply_item_ops([{'op': 'remove', 'id': new_id}])
+
+    return {
+        'list doc (KB)': len(encode(stored)) / 1024,
+        'load list': time_ms(lambda: ShoppingList.find_by_id(list_id, user_id), repeat),
+        'load overview': time_ms(lambda: ShoppingList.find_by_user_id(user_id), repeat),
+        'rename list': time_ms(lambda: shopping_list.update({'name': 'Renamed'}), repeat),
+        'toggle item': time_ms(toggle_item, repeat),
+        'add+remove item': time_ms(add_and_remove_item, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark shopping list item storage modes')
+    parser.add_argument('--sizes', default='10,100,1000', help='comma-separated item counts')
+    parser.add_argument('--repeat', type=int, default=50, help='runs per operation')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    db.initialize(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'), BENCHMARK_DATABASE)
+    try:
+        results = {(storage, size): run_case(storage, size, args.repeat)
+                   for size in sizes for storage in ITEM_STORAGE_MODES}
+
+        metrics = list(next(iter(results.values())))
+        print(f"{'items':>6} {'storage':<11}" + ''.join(f"{metric:>17}" for metric in metrics))
+        for (storage, size), result in results.items():
+            print(f"{size:>6} {storage:<11}" + ''.join(f"{result[metric]:>17.2f}" for metric in metrics))
+        print("Times are median milliseconds")
+    finally:
+        db.client.drop_database(BENCHMARK_DATABASE)
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
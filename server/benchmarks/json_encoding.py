@@ -0,0 +1,124 @@
+"""
+Compare response serialization with Flask's default JSON provider and BSONJSONProvider
+
+Builds realistic GET /api/shopping/lists and GET /api/homes payloads in
+memory and times to_dict plus response encoding. No database needed.
+
+Usage:
+    python benchmarks/json_encoding.py [--lists 10,50,200] [--items 20] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+# Run from the server directory or from benchmarks/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import json_provider
+from json_provider import BSONJSONProvider
+from home_models import Home
+from shopping_models import ShoppingList, get_unix_timestamp
+
+
+def make_lists(count, item_count):
+    """Build home lists shaped like stored documents, with realistic notes"""
+    home_id = ObjectId()
+    now = get_unix_timestamp()
+    lists = []
+    for index in range(count):
+        items = [
+            ShoppingList._new_item(f"Item {item}", item % 5 + 1, 'Groceries', 'Pick the ripe ones, not the green ones.')
+            for item in range(item_count)
+        ]
+        for item in items[::3]:
+            item['completed'] = True
+        lists.append(ShoppingList({
+            '_id': ObjectId(), 'user_id': ObjectId(), 'home_id': home_id,
+            'name': f"List {index}", 'description': 'Weekly shop', 'color': '#1976d2',
+            'archived': False, 'status': 'active', 'items': items,
+            'item_count': item_count, 'completed_count': len(items[::3]),
+            'version': 7, 'field_versions': {'items': 7, 'name': 2},
+            'createdAt': now, 'updatedAt': now
+        }))
+    return lists
+
+
+def make_homes(count, member_count):
+    """Build homes with member lists"""
+    now = get_unix_timestamp()
+    return [
+        Home({
+            '_id': ObjectId(), 'name': f"Home {index}", 'description': '', 'creator_id': ObjectId(),
+            'members': [ObjectId() for _ in range(member_count)], 'createdAt': now, 'updatedAt': now
+        })
+        for index in range(count)
+    ]
+
+
+def enriched(shopping_list, stringify_ids):
+    """Approximate enrich_shopping_lists output for one list"""
+    list_dict = shopping_list.to_dict(stringify_ids=stringify_ids)
+    list_dict['home'] = {'id': str(shopping_list.data['home_id']), 'name': 'Home'}
+    list_dict['permissions'] = {'can_edit': True, 'can_complete_items': True}
+    return list_dict
+
+
+def time_ms(func, repeat):
+    """Median wall time of func in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON response serialization')
+    parser.add_argument('--lists', default='10,50,200', help='comma-separated list counts')
+    parser.add_argument('--items', type=int, default=20, help='items per list')
+    parser.add_argument('--repeat', type=int, default=200, help='runs per case')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {
+        'default': (DefaultJSONProvider(app), True),
+        'bson': (BSONJSONProvider(app), False),
+    }
+    print(f"BSONJSONProvider encoder: {'orjson' if json_provider.orjson else 'json (orjson not installed)'}")
+
+    cases = [(f"lists x{count}", make_lists(count, args.items)) for count in map(int, args.lists.split(','))]
+    cases.append(('homes x20', make_homes(20, 8)))
+
+    print(f"{'payload':<12}{'KB':>8}{'default ms':>12}{'bson ms':>10}{'speedup':>9}")
+    with app.app_context():
+        for name, documents in cases:
+            timings = {}
+            bodies = {}
+            for label, (provider, stringify_ids) in providers.items():
+                if isinstance(documents[0], Home):
+                    def build(provider=provider, stringify_ids=stringify_ids):
+                        return provider.response({'homes': [home.to_dict(stringify_ids) for home in documents]})
+                else:
+                    def build(provider=provider, stringify_ids=stringify_ids):
+                        return provider.response({'shopping_lists': [enriched(sl, stringify_ids) for sl in documents]})
+                bodies[label] = build().get_data()
+                timings[label] = time_ms(build, args.repeat)
+
+            # Both providers must produce the same JSON document
+            assert json.loads(bodies['default']) == json.loads(bodies['bson']), name
+            print(f"{name:<12}{len(bodies['default']) / 1024:>8.1f}{timings['default']:>12.3f}"
+                  f"{timings['bson']:>10.3f}{timings['default'] / timings['bson']:>8.1f}x")
+    print("Times are median milliseconds for to_dict plus encoding")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Response compression negotiated via Accept-Encoding
+Compresses JSON and text bodies above a size threshold with brotli (when
+installed) or gzip, and keeps compressed bodies of ETagged responses in a
+small LRU so hot unchanged resources are only compressed once
+"""
+
+import gzip
+from typing import Any, Optional
+
+from flask import request
+
+from etag import CONTENT_CODINGS, encoded_etag
+from ttl_cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Compressed bodies larger than this are not cached (bytes)
+MAX_CACHED_BODY = 1024 * 1024
+
+# (etag, encoding) -> compressed body; ETags are per user and query, so entries never leak across users
+_compressed_cache = TTLCache(maxsize=256, ttl=3600)
+
+
+def init_app(app) -> None:
+    """Compress responses of the app, configured by COMPRESSION_MIN_SIZE and COMPRESSION_CACHE_SIZE"""
+    _compressed_cache.maxsize = app.config['COMPRESSION_CACHE_SIZE']
+    min_size = app.config['COMPRESSION_MIN_SIZE']
+
+    @app.after_request
+    def compress_response(response):
+        return compress(response, min_size)
+
+
+def available_encodings() -> tuple:
+    """Get the supported content codings in order of preference"""
+    return tuple(encoding for encoding in CONTENT_CODINGS if encoding != 'br' or brotli is not None)
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Pick the preferred coding the client accepts (q-values respected), or None"""
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress(response: Any, min_size: int) -> Any:
+    """Compress a response in place when it is worth it and the client accepts it"""
+    if not _is_compressible(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    # A 304 carries no body, only the tag of the representation the client holds
+    etag, weak = response.get_etag()
+    if response.status_code == 304 or response.calculate_content_length() < min_size:
+        return response
+
+    body = _compressed_cache.get((etag, encoding)) if etag and not weak else None
+    if body is None:
+        body = _encode(response.get_data(), encoding)
+        if etag and not weak and len(body) <= MAX_CACHED_BODY:
+            _compressed_cache.set((etag, encoding), body)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        # Compressed bytes differ from the identity body, so they get their own tag
+        response.set_etag(encoded_etag(etag, encoding), weak=weak)
+    return response
+
+
+def _is_compressible(response: Any) -> bool:
+    if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers:
+        return False
+    if response.status_code != 304 and (response.status_code < 200 or response.status_code in (204, 206)):
+        return False
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def _encode(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # Fixed mtime so the same body always compresses to the same bytes
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
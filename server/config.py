@@ -9,6 +9,8 @@ class Config:
     # MongoDB
     MONGO_URI = os.environ.get('MONGO_URI') or 'mongodb://localhost:27017/'
     DATABASE_NAME = os.environ.get('DATABASE_NAME') or 'shopping_list_db'
+    # Run explain() on model queries at startup and warn about collection scans
+    CHECK_QUERY_PLANS = os.environ.get('CHECK_QUERY_PLANS', 'False').lower() == 'true'
     
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
@@ -22,6 +24,42 @@ class Config:
     JWT_BLACKLIST_ENABLED = True
     JWT_BLACKLIST_TOKEN_CHECKS = ['access', 'refresh']
     
+    # Token blacklist cache (seconds)
+    TOKEN_BLACKLIST_REFRESH_INTERVAL = int(os.environ.get('TOKEN_BLACKLIST_REFRESH_INTERVAL', '30'))
+    TOKEN_BLACKLIST_CACHE_TTL = int(os.environ.get('TOKEN_BLACKLIST_CACHE_TTL', '300'))
+    
+    # Expiry reaper for blacklisted tokens and sessions (seconds, 0 disables)
+    EXPIRY_REAPER_INTERVAL = int(os.environ.get('EXPIRY_REAPER_INTERVAL', '3600'))
+    
+    # Where new shopping lists keep their items: 'embedded' in the list document
+    # or 'collection' (one shopping_items document per item, for large lists)
+    SHOPPING_ITEM_STORAGE = os.environ.get('SHOPPING_ITEM_STORAGE', 'embedded')
+    
+    # How far back GET/POST /api/shopping/changes reports deleted lists
+    # (seconds); older deletions only show up for IDs the client sends as known
+    CHANGES_TOMBSTONE_RETENTION = int(os.environ.get('CHANGES_TOMBSTONE_RETENTION', str(30 * 24 * 3600)))
+    
+    # Rebuild of the materialized shopping stats, reporting drift (seconds, 0 disables)
+    STATS_RECONCILE_INTERVAL = int(os.environ.get('STATS_RECONCILE_INTERVAL', '3600'))
+    
+    # How long home member profiles are cached (seconds); membership changes
+    # apply at once, profile edits of members within this delay
+    HOME_MEMBER_CACHE_TTL = int(os.environ.get('HOME_MEMBER_CACHE_TTL', '30'))
+    
+    # How often the in-process home membership index checks MongoDB for writes
+    # made by other processes (seconds, 0 disables the index)
+    MEMBERSHIP_SYNC_INTERVAL = int(os.environ.get('MEMBERSHIP_SYNC_INTERVAL', '10'))
+    
+    # Response compression: smallest body worth compressing (bytes) and
+    # number of compressed bodies of unchanged resources kept in memory
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_CACHE_SIZE = int(os.environ.get('COMPRESSION_CACHE_SIZE', '256'))
+    
+    # Sessions
+    SESSION_ACTIVITY_UPDATE_INTERVAL = int(
+        os.environ.get('SESSION_ACTIVITY_UPDATE_INTERVAL', '300')  # 5 minutes
+    )
+    
     # Google OAuth
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
@@ -36,6 +74,7 @@ class Config:
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    CHECK_QUERY_PLANS = os.environ.get('CHECK_QUERY_PLANS', 'True').lower() == 'true'
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -1,8 +1,139 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING
 from pymongo.errors import ConnectionFailure
+from bson import ObjectId
 import os
 from datetime import datetime
 
+# Indexes for every query shape issued by the models, as (keys, options) per
+# collection. Applied idempotently at startup by Database._create_indexes.
+INDEX_REGISTRY = {
+    'users': [
+        ([('email', ASCENDING)], {'unique': True}),
+        ([('username', ASCENDING)], {'unique': True, 'sparse': True}),
+        ([('google_id', ASCENDING)], {'unique': True, 'sparse': True}),
+        # Whether a stored photo is still referenced before deleting it
+        ([('photo_id', ASCENDING)], {'sparse': True}),
+    ],
+    'user_sessions': [
+        # Looked up by token JWT ID on every authenticated request
+        ([('access_token_jti', ASCENDING)], {}),
+        ([('refresh_token_jti', ASCENDING)], {}),
+        ([('user_id', ASCENDING), ('is_active', ASCENDING), ('last_activity', DESCENDING)], {}),
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+    ],
+    'token_blacklist': [
+        ([('jti', ASCENDING)], {'unique': True}),
+        ([('blacklisted_at', ASCENDING)], {}),
+        ([('expires_at', ASCENDING)], {'expireAfterSeconds': 0}),
+    ],
+    'shopping_lists': [
+        # Personal and home branches of the accessible-lists $or, sorted and
+        # paginated by (createdAt, _id)
+        ([('user_id', ASCENDING), ('status', ASCENDING), ('createdAt', ASCENDING), ('_id', ASCENDING)], {}),
+        ([('home_id', ASCENDING), ('status', ASCENDING), ('createdAt', ASCENDING), ('_id', ASCENDING)], {}),
+        # Cover the sync-check projection (_id, updatedAt) for both branches
+        ([('user_id', ASCENDING), ('status', ASCENDING), ('updatedAt', ASCENDING), ('_id', ASCENDING)], {}),
+        ([('home_id', ASCENDING), ('status', ASCENDING), ('updatedAt', ASCENDING), ('_id', ASCENDING)], {}),
+    ],
+    'shopping_items': [
+        # Items of collection-mode lists, loaded per list in display order
+        ([('list_id', ASCENDING), ('position', ASCENDING), ('_id', ASCENDING)], {}),
+        ([('list_id', ASCENDING), ('id', ASCENDING)], {'unique': True}),
+    ],
+    'user_stats': [
+        # Rollups of a user's own lists in homes, for homes they left
+        ([('user_id', ASCENDING), ('home_id', ASCENDING)], {'sparse': True}),
+    ],
+    'homes': [
+        ([('members', ASCENDING), ('createdAt', DESCENDING)], {}),
+        ([('creator_id', ASCENDING), ('createdAt', DESCENDING)], {}),
+        # Latest write, polled by the membership cache sync
+        ([('updatedAt', DESCENDING)], {}),
+    ],
+    'home_invitations': [
+        ([('to_user_email', ASCENDING), ('status', ASCENDING), ('createdAt', DESCENDING)], {}),
+        ([('to_user_id', ASCENDING), ('status', ASCENDING), ('createdAt', DESCENDING)], {}),
+        ([('home_id', ASCENDING), ('status', ASCENDING), ('createdAt', DESCENDING)], {}),
+        ([('from_user_id', ASCENDING), ('createdAt', DESCENDING)], {}),
+    ],
+}
+
+# Representative model queries as (collection, name, filter, sort), checked
+# with explain() at startup to catch queries that fall back to a COLLSCAN
+_SAMPLE_ID = ObjectId()
+QUERY_SHAPES = [
+    ('users', 'User.find_by_email', {'email': 'user@example.com'}, None),
+    ('users', 'User.find_by_google_id', {'google_id': 'google-id'}, None),
+    ('users', 'username availability', {'username': 'username'}, None),
+    ('users', 'PhotoStore.release', {'photo_id': 'photo-id'}, None),
+    ('user_sessions', 'SessionManager.find_by_access_token_jti', {'access_token_jti': 'jti', 'is_active': True}, None),
+    ('user_sessions', 'SessionManager.find_by_refresh_token_jti', {'refresh_token_jti': 'jti', 'is_active': True}, None),
+    ('user_sessions', 'SessionManager.get_user_sessions', {'user_id': str(_SAMPLE_ID), 'is_active': True}, [('last_activity', DESCENDING)]),
+    ('token_blacklist', 'TokenBlacklist.is_token_blacklisted', {'jti': 'jti'}, None),
+    ('token_blacklist', 'TokenBlacklist refresh', {'blacklisted_at': {'$gte': datetime(2000, 1, 1)}}, None),
+    ('shopping_lists', 'ShoppingList.find_by_user_id', {
+        '$or': [{'user_id': _SAMPLE_ID}, {'home_id': {'$in': [_SAMPLE_ID]}}],
+        'status': 'active'
+    }, [('createdAt', ASCENDING), ('_id', ASCENDING)]),
+    ('shopping_lists', 'ShoppingList.find_by_user_id (home)', {'home_id': _SAMPLE_ID, 'status': 'active'}, [
+        ('createdAt', ASCENDING), ('_id', ASCENDING)
+    ]),
+    ('shopping_lists', 'ShoppingList.find_by_user_id (archived)', {
+        '$or': [{'user_id': _SAMPLE_ID}, {'home_id': {'$in': [_SAMPLE_ID]}}],
+        'status': {'$in': ['active', 'completed', 'archived', None]}
+    }, [('createdAt', ASCENDING), ('_id', ASCENDING)]),
+    ('shopping_lists', 'ShoppingList.find_by_user_id (page)', {
+        '$or': [{'user_id': _SAMPLE_ID}, {'home_id': {'$in': [_SAMPLE_ID]}}],
+        'status': 'active',
+        'createdAt': {'$gte': 0},
+        '$nor': [{'createdAt': 0, '_id': {'$lte': 'list-id'}}]
+    }, [('createdAt', ASCENDING), ('_id', ASCENDING)]),
+    ('shopping_lists', 'ShoppingList.find_sync_timestamps', {
+        '$or': [{'user_id': _SAMPLE_ID}, {'home_id': {'$in': [_SAMPLE_ID]}}],
+        'status': 'active'
+    }, None),
+    ('shopping_lists', 'ShoppingList.find_changed_since', {
+        '$or': [
+            {'user_id': _SAMPLE_ID, 'updatedAt': {'$gte': 0}},
+            {'home_id': {'$in': [_SAMPLE_ID]}, 'updatedAt': {'$gte': 0}}
+        ]
+    }, [('updatedAt', ASCENDING)]),
+    ('shopping_items', 'ShoppingItems.find_by_list_ids', {'list_id': {'$in': [_SAMPLE_ID]}}, [
+        ('list_id', ASCENDING), ('position', ASCENDING), ('_id', ASCENDING)
+    ]),
+    ('shopping_items', 'ShoppingItems.update_one', {'list_id': _SAMPLE_ID, 'id': 'item-id'}, None),
+    ('user_stats', 'StatsRollup.find_for_user', {'$or': [
+        {'_id': {'$in': [_SAMPLE_ID]}},
+        {'user_id': _SAMPLE_ID, 'home_id': {'$nin': [_SAMPLE_ID]}}
+    ]}, None),
+    ('homes', 'Home.find_by_user_id', {'members': _SAMPLE_ID}, [('createdAt', DESCENDING)]),
+    ('homes', 'Home.find_by_creator_id', {'creator_id': _SAMPLE_ID}, [('createdAt', DESCENDING)]),
+    ('homes', 'MembershipCache.sync', {}, [('updatedAt', DESCENDING)]),
+    ('home_invitations', 'HomeInvitation.find_pending_for_user', {
+        'status': 'pending',
+        '$or': [{'to_user_email': 'user@example.com'}, {'to_user_id': _SAMPLE_ID}]
+    }, [('createdAt', DESCENDING)]),
+    ('home_invitations', 'HomeInvitation.find_pending_for_home', {'home_id': _SAMPLE_ID, 'status': 'pending'}, [('createdAt', DESCENDING)]),
+    ('home_invitations', 'HomeInvitation.find_pending_for_homes', {
+        'home_id': {'$in': [_SAMPLE_ID]}, 'status': 'pending', 'type': 'request'
+    }, [('createdAt', DESCENDING)]),
+    ('home_invitations', 'HomeInvitation.find_sent_by_user', {'from_user_id': _SAMPLE_ID}, [('createdAt', DESCENDING)]),
+    ('home_invitations', 'HomeInvitation.check_existing_invitation', {
+        'home_id': _SAMPLE_ID, 'to_user_email': 'user@example.com', 'type': 'invite', 'status': 'pending'
+    }, None),
+]
+
+
+def _plan_has_stage(plan, stage_name):
+    """Check recursively whether an explain() plan contains a stage"""
+    if not isinstance(plan, dict):
+        return False
+    if plan.get('stage') == stage_name:
+        return True
+    # SBE engines (MongoDB 7+) nest the classic plan under 'queryPlan'
+    children = [plan.get('inputStage'), plan.get('queryPlan')] + plan.get('inputStages', [])
+    return any(_plan_has_stage(child, stage_name) for child in children if child)
+
 class Database:
     _instance = None
     _client = None
@@ -13,7 +144,7 @@ class Database:
             cls._instance = super(Database, cls).__new__(cls)
         return cls._instance
     
-    def initialize(self, mongo_uri, database_name):
+    def initialize(self, mongo_uri, database_name, check_query_plans=False):
         """Initialize the database connection"""
         try:
             self._client = MongoClient(mongo_uri)
@@ -25,22 +156,48 @@ class Database:
             # Create indexes
             self._create_indexes()
             
+            if check_query_plans:
+                self.check_query_plans()
+            
         except ConnectionFailure as e:
             print(f"[Database] Failed to connect to MongoDB: {e}")
             raise
     
     def _create_indexes(self):
         """Create database indexes for optimization"""
-        # Users collection indexes
-        users = self._db.users
-        
         # Create indexes safely, handling conflicts
-        self._create_index_safely(users, "email", unique=True)
-        self._create_index_safely(users, "username", unique=True, sparse=True)
-        self._create_index_safely(users, "google_id", unique=True, sparse=True)
+        for collection_name, indexes in INDEX_REGISTRY.items():
+            collection = self._db[collection_name]
+            for keys, options in indexes:
+                self._create_index_safely(collection, keys, **options)
         
         print("[Database] Indexes created successfully")
     
+    def check_query_plans(self) -> list:
+        """Explain every registered model query and warn about collection scans
+        
+        Returns the names of the queries whose winning plan is a COLLSCAN.
+        """
+        collscans = []
+        for collection_name, name, query, sort in QUERY_SHAPES:
+            cursor = self._db[collection_name].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            
+            try:
+                plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+            except Exception as e:
+                print(f"[Database] Warning: Could not explain query '{name}': {e}")
+                continue
+            
+            if _plan_has_stage(plan, 'COLLSCAN'):
+                collscans.append(name)
+                print(f"[Database] Warning: Query '{name}' on '{collection_name}' uses a COLLSCAN")
+        
+        if not collscans:
+            print(f"[Database] All {len(QUERY_SHAPES)} model queries are index-backed")
+        return collscans
+    
     def _create_index_safely(self, collection, field, **kwargs):
         """Create an index safely, handling existing index conflicts"""
         try:
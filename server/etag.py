@@ -0,0 +1,42 @@
+"""
+Strong ETags for conditional GETs
+Tags are hashed from the validators a response depends on (IDs, updatedAt,
+versions), so a matching If-None-Match is answered before the body is built
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from flask import request, current_app
+
+# Content codings responses may be compressed with (see compression.py)
+CONTENT_CODINGS = ('br', 'gzip')
+
+
+def compute_etag(*validators: Any) -> str:
+    """Hash validators into an opaque tag, scoped to the request path and query string"""
+    key = repr((request.path, sorted(request.args.items(multi=True)), validators))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Get the tag of a content-encoded (compressed) representation"""
+    return f"{etag}-{encoding}"
+
+
+def not_modified(etag: str) -> Optional[Any]:
+    """Get a 304 response when the request's If-None-Match matches etag, otherwise None
+
+    Tags of compressed representations of the same body match as well.
+    """
+    for tag in (etag, *(encoded_etag(etag, encoding) for encoding in CONTENT_CODINGS)):
+        if request.if_none_match.contains_weak(tag):
+            return with_etag(current_app.response_class(status=304), tag)
+    return None
+
+
+def with_etag(response: Any, etag: str) -> Any:
+    """Tag a response and make clients revalidate it before reuse"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -1,16 +1,126 @@
 from database import db
+import request_cache
+from ttl_cache import TTLCache
 from bson import ObjectId
-from typing import Optional, Dict, Any, List
+from pymongo import DESCENDING
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+import threading
 import time
 
 def get_unix_timestamp() -> int:
     """Get current Unix timestamp in milliseconds"""
     return int(time.time() * 1000)
 
+class MembershipCache:
+    """Process-local membership index: user ID -> home IDs, home ID -> (creator ID, member IDs)
+    
+    Loaded from the homes collection by sync(), kept current by the Home
+    mutation methods of this process, and reloaded by a periodic sync when
+    the collection's version (home count, latest updatedAt) moves, which
+    covers writes from other processes. Lookups return None until loaded,
+    so callers fall back to querying MongoDB.
+    """
+    _lock = threading.Lock()
+    _homes: Dict[str, Tuple[ObjectId, frozenset]] = {}
+    _user_homes: Dict[str, frozenset] = {}
+    _version: Optional[Tuple[int, int]] = None
+    _loaded = False
+    
+    @classmethod
+    def is_loaded(cls) -> bool:
+        return cls._loaded
+    
+    @classmethod
+    def home_ids(cls, user_id: str) -> Optional[frozenset]:
+        """Get the IDs of the homes a user is a member of, or None when not loaded"""
+        if not cls._loaded:
+            return None
+        return cls._user_homes.get(str(user_id), frozenset())
+    
+    @classmethod
+    def is_member(cls, home_id: str, user_id: str) -> Optional[bool]:
+        """Check membership of a home, or None when not loaded"""
+        if not cls._loaded:
+            return None
+        home = cls._homes.get(str(home_id))
+        return bool(home and ObjectId(user_id) in home[1])
+    
+    @classmethod
+    def sync(cls) -> Optional[Dict[str, int]]:
+        """Reload the index when the homes collection changed since the last load; returns load stats"""
+        version = cls._collection_version()
+        if cls._loaded and version == cls._version:
+            return None
+        return cls._load(version)
+    
+    @classmethod
+    def _collection_version(cls) -> Tuple[int, int]:
+        homes_collection = db.get_collection('homes')
+        latest = list(homes_collection.find({}, {'updatedAt': 1}).sort('updatedAt', DESCENDING).limit(1))
+        return homes_collection.estimated_document_count(), latest[0].get('updatedAt', 0) if latest else 0
+    
+    @classmethod
+    def _load(cls, version: Tuple[int, int]) -> Dict[str, int]:
+        homes_collection = db.get_collection('homes')
+        homes = {
+            str(home_data['_id']): (home_data['creator_id'], frozenset(home_data.get('members', [])))
+            for home_data in homes_collection.find({}, {'creator_id': 1, 'members': 1})
+        }
+        user_homes: Dict[str, set] = {}
+        for home_id, (_, members) in homes.items():
+            for member_id in members:
+                user_homes.setdefault(str(member_id), set()).add(ObjectId(home_id))
+        
+        with cls._lock:
+            cls._homes = homes
+            cls._user_homes = {user_id: frozenset(home_ids) for user_id, home_ids in user_homes.items()}
+            cls._version = version
+            cls._loaded = True
+        return {'homes': len(homes), 'users': len(user_homes)}
+    
+    @classmethod
+    def put_home(cls, home_data: Dict[str, Any]) -> None:
+        """Record a home's current creator and members after a write in this process"""
+        if not cls._loaded:
+            return
+        home_id = str(home_data['_id'])
+        members = frozenset(home_data.get('members', []))
+        with cls._lock:
+            previous = cls._homes.get(home_id)
+            cls._homes[home_id] = (home_data['creator_id'], members)
+            cls._reindex(home_data['_id'], previous[1] if previous else frozenset(), members)
+    
+    @classmethod
+    def remove_home(cls, home_id: Any) -> None:
+        """Forget a deleted home"""
+        if not cls._loaded:
+            return
+        with cls._lock:
+            previous = cls._homes.pop(str(home_id), None)
+            if previous:
+                cls._reindex(ObjectId(home_id), previous[1], frozenset())
+    
+    @classmethod
+    def _reindex(cls, home_id: ObjectId, old_members: frozenset, new_members: frozenset) -> None:
+        """Update user -> home IDs for members who joined or left (caller holds the lock)"""
+        for member_id in old_members - new_members:
+            cls._user_homes[str(member_id)] = cls._user_homes.get(str(member_id), frozenset()) - {home_id}
+        for member_id in new_members - old_members:
+            cls._user_homes[str(member_id)] = cls._user_homes.get(str(member_id), frozenset()) | {home_id}
+
 class Home:
+    # Member profiles per home ID, as (home updatedAt, members), shared across requests
+    _member_cache = TTLCache(maxsize=1024, ttl=30)
+    
     def __init__(self, data: Dict[str, Any]):
         self.data = data
     
+    @classmethod
+    def configure(cls, member_cache_ttl: Optional[int] = None) -> None:
+        """Configure how long member profiles are cached per home (seconds)"""
+        if member_cache_ttl is not None:
+            cls._member_cache = TTLCache(maxsize=1024, ttl=member_cache_ttl)
+    
     @property
     def id(self) -> str:
         return str(self.data['_id'])
@@ -30,6 +140,9 @@ class Home:
         homes_collection = db.get_collection('homes')
         result = homes_collection.insert_one(home_data)
         home_data['_id'] = result.inserted_id
+        request_cache.invalidate('user_homes', str(creator_id))
+        request_cache.invalidate('user_home_ids', str(creator_id))
+        MembershipCache.put_home(home_data)
         
         return cls(home_data)
     
@@ -40,24 +153,94 @@ class Home:
         
         try:
             if ObjectId.is_valid(home_id):
+                cached = request_cache.get('home', str(home_id))
+                if cached is not request_cache.MISSING:
+                    return cached
                 home_data = homes_collection.find_one({'_id': ObjectId(home_id)})
             else:
                 return None
         except Exception:
             return None
         
-        return cls(home_data) if home_data else None
+        return request_cache.put('home', str(home_id), cls(home_data) if home_data else None)
+    
+    @classmethod
+    def find_by_ids(cls, home_ids: Iterable[Any]) -> Dict[str, 'Home']:
+        """Find several homes by ID with a single query, keyed by string ID"""
+        keys = {str(home_id) for home_id in home_ids if ObjectId.is_valid(home_id)}
+        cached, missing = request_cache.get_many('home', keys)
+        homes = {key: home for key, home in cached.items() if home}
+        if not missing:
+            return homes
+        
+        homes_collection = db.get_collection('homes')
+        homes_data = homes_collection.find({'_id': {'$in': [ObjectId(key) for key in missing]}})
+        for home_data in homes_data:
+            homes[str(home_data['_id'])] = request_cache.put('home', str(home_data['_id']), cls(home_data))
+        return homes
     
     @classmethod
     def find_by_user_id(cls, user_id: str) -> List['Home']:
         """Find all homes where user is a member"""
+        cached = request_cache.get('user_homes', str(user_id))
+        if cached is not request_cache.MISSING:
+            return list(cached)
+        
         homes_collection = db.get_collection('homes')
         
         homes_data = homes_collection.find({
             'members': ObjectId(user_id)
         }).sort('createdAt', -1)
         
-        return [cls(home_data) for home_data in homes_data]
+        homes = []
+        for home_data in homes_data:
+            # Reuse instances already in the identity map so both lookups share state
+            home = request_cache.get('home', str(home_data['_id']))
+            if home is request_cache.MISSING or home is None:
+                home = request_cache.put('home', str(home_data['_id']), cls(home_data))
+            homes.append(home)
+        
+        request_cache.put('user_homes', str(user_id), homes)
+        return list(homes)
+    
+    @classmethod
+    def find_ids_by_user_id(cls, user_id: str) -> List[ObjectId]:
+        """Find the IDs of all homes where user is a member (projection only)"""
+        home_ids = MembershipCache.home_ids(user_id)
+        if home_ids is not None:
+            return list(home_ids)
+        
+        cached = request_cache.get('user_home_ids', str(user_id))
+        if cached is not request_cache.MISSING:
+            return list(cached)
+        
+        # Reuse full home documents if this request already loaded them
+        cached_homes = request_cache.get('user_homes', str(user_id))
+        if cached_homes is not request_cache.MISSING:
+            home_ids = [home.data['_id'] for home in cached_homes]
+        else:
+            homes_collection = db.get_collection('homes')
+            home_ids = [
+                home_data['_id']
+                for home_data in homes_collection.find({'members': ObjectId(user_id)}, {'_id': 1})
+            ]
+        
+        request_cache.put('user_home_ids', str(user_id), home_ids)
+        return list(home_ids)
+    
+    @classmethod
+    def find_ids_updated_since(cls, home_ids: List[ObjectId], since: int) -> List[ObjectId]:
+        """Filter home IDs down to homes updated at or after a Unix timestamp (ms)"""
+        if not home_ids:
+            return []
+        
+        homes_collection = db.get_collection('homes')
+        return [
+            home_data['_id']
+            for home_data in homes_collection.find(
+                {'_id': {'$in': home_ids}, 'updatedAt': {'$gte': since}}, {'_id': 1}
+            )
+        ]
     
     @classmethod
     def find_by_creator_id(cls, creator_id: str) -> List['Home']:
@@ -70,6 +253,14 @@ class Home:
         
         return [cls(home_data) for home_data in homes_data]
     
+    def _invalidate_cached(self) -> None:
+        """Drop this home and membership-derived lookups from the request identity map"""
+        request_cache.invalidate('home', self.id)
+        request_cache.invalidate('user_homes')
+        request_cache.invalidate('user_home_ids')
+        request_cache.invalidate('shopping_list')
+        self._member_cache.pop(self.id)
+    
     def is_creator(self, user_id: str) -> bool:
         """Check if user is the creator of this home"""
         return str(self.data['creator_id']) == user_id
@@ -78,6 +269,16 @@ class Home:
         """Check if user is a member of this home"""
         return ObjectId(user_id) in self.data['members']
     
+    @classmethod
+    def is_member_of(cls, home_id: str, user_id: str) -> bool:
+        """Check membership of a home by ID, from the membership cache when loaded"""
+        is_member = MembershipCache.is_member(home_id, user_id)
+        if is_member is not None:
+            return is_member
+        
+        home = cls.find_by_id(home_id)
+        return bool(home and home.is_member(user_id))
+    
     def add_member(self, user_id: str) -> bool:
         """Add a user as a member of this home"""
         user_object_id = ObjectId(user_id)
@@ -93,9 +294,11 @@ class Home:
                 '$set': {'updatedAt': get_unix_timestamp()}
             }
         )
+        self._invalidate_cached()
         
         self.data['members'].append(user_object_id)
         self.data['updatedAt'] = get_unix_timestamp()
+        MembershipCache.put_home(self.data)
         return True
     
     def remove_member(self, user_id: str) -> bool:
@@ -117,9 +320,11 @@ class Home:
                 '$set': {'updatedAt': get_unix_timestamp()}
             }
         )
+        self._invalidate_cached()
         
         self.data['members'].remove(user_object_id)
         self.data['updatedAt'] = get_unix_timestamp()
+        MembershipCache.put_home(self.data)
         return True
     
     def update(self, update_data: Dict[str, Any]) -> None:
@@ -131,25 +336,51 @@ class Home:
             {'_id': self.data['_id']},
             {'$set': update_data}
         )
+        self._invalidate_cached()
         
         self.data.update(update_data)
+        MembershipCache.put_home(self.data)
     
     def delete(self) -> None:
         """Delete the home"""
         homes_collection = db.get_collection('homes')
         homes_collection.delete_one({'_id': self.data['_id']})
+        self._invalidate_cached()
+        MembershipCache.remove_home(self.data['_id'])
+    
+    def get_members(self) -> List[Any]:
+        """Get the members' public profiles (partial Users) in member order
+        
+        Loaded with one $in query and cached for a short TTL per home. Entries
+        are dropped by membership changes and ignored once the home's
+        updatedAt moves, so only profile edits can show up late.
+        """
+        cached = self._member_cache.get(self.id)
+        if cached is not None and cached[0] == self.data.get('updatedAt'):
+            return list(cached[1])
+        
+        from models import User, PUBLIC_PROFILE_FIELDS
+        users = User.find_many(self.data['members'], fields=PUBLIC_PROFILE_FIELDS)
+        members = [users[str(member_id)] for member_id in self.data['members'] if str(member_id) in users]
+        
+        self._member_cache.set(self.id, (self.data.get('updatedAt'), members))
+        return list(members)
     
     def get_member_count(self) -> int:
         """Get the number of members in this home"""
         return len(self.data['members'])
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization"""
-        result = self.data.copy()
-        result['_id'] = str(result['_id'])
-        result['creator_id'] = str(result['creator_id'])
-        result['members'] = [str(member_id) for member_id in result['members']]
-        result['member_count'] = len(result['members'])
+    def to_dict(self, stringify_ids: bool = True) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization
+        
+        With stringify_ids=False ObjectIds (including members) are left for
+        the app's JSON provider to encode instead of being converted here.
+        """
+        result = {**self.data, 'member_count': len(self.data['members'])}
+        if stringify_ids:
+            result['_id'] = str(result['_id'])
+            result['creator_id'] = str(result['creator_id'])
+            result['members'] = [str(member_id) for member_id in result['members']]
         
         return result
 
@@ -229,6 +460,26 @@ class HomeInvitation:
         
         return [cls(invitation_data) for invitation_data in invitations_data]
     
+    @classmethod
+    def find_pending_for_homes(cls, home_ids: Iterable[Any], invitation_type: Optional[str] = None) -> List['HomeInvitation']:
+        """Find pending invitations (optionally of one type) for several homes with a single query
+        
+        Grouped by home in the order of home_ids, newest first within each home.
+        """
+        home_order = {str(home_id): index for index, home_id in enumerate(home_ids)}
+        if not home_order:
+            return []
+        
+        invitations_collection = db.get_collection('home_invitations')
+        
+        query = {'home_id': {'$in': [ObjectId(home_id) for home_id in home_order]}, 'status': 'pending'}
+        if invitation_type:
+            query['type'] = invitation_type
+        
+        invitations = [cls(invitation_data) for invitation_data in invitations_collection.find(query).sort('createdAt', -1)]
+        invitations.sort(key=lambda invitation: home_order[str(invitation.data['home_id'])])
+        return invitations
+    
     @classmethod
     def find_sent_by_user(cls, user_id: str) -> List['HomeInvitation']:
         """Find all invitations sent by a user"""
@@ -301,14 +552,15 @@ class HomeInvitation:
         invitations_collection = db.get_collection('home_invitations')
         invitations_collection.delete_one({'_id': self.data['_id']})
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization"""
-        result = self.data.copy()
-        result['_id'] = str(result['_id'])
-        result['home_id'] = str(result['home_id'])
-        result['from_user_id'] = str(result['from_user_id'])
-        
-        if 'to_user_id' in result:
-            result['to_user_id'] = str(result['to_user_id'])
+    def to_dict(self, stringify_ids: bool = True) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization (see Home.to_dict for stringify_ids)"""
+        result = dict(self.data)
+        if stringify_ids:
+            result['_id'] = str(result['_id'])
+            result['home_id'] = str(result['home_id'])
+            result['from_user_id'] = str(result['from_user_id'])
+            
+            if 'to_user_id' in result:
+                result['to_user_id'] = str(result['to_user_id'])
         
         return result
@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from home_models import Home, HomeInvitation
-from models import User
+from models import User, PUBLIC_PROFILE_FIELDS
 from middleware import validate_json, auth_required
+from etag import compute_etag, not_modified, with_etag
 from bson import ObjectId
 import re
 
@@ -21,9 +22,14 @@ def get_user_homes():
         user_id = get_jwt_identity()
         homes = Home.find_by_user_id(user_id)
         
-        return jsonify({
-            'homes': [home.to_dict() for home in homes]
-        }), 200
+        etag = compute_etag(str(user_id), [(home.id, home.data.get('updatedAt', 0)) for home in homes])
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
+        return with_etag(jsonify({
+            'homes': [home.to_dict(stringify_ids=False) for home in homes]
+        }), etag), 200
         
     except Exception as e:
         current_app.logger.error(f"Get user homes error: {e}")
@@ -51,7 +57,7 @@ def create_home():
         
         return jsonify({
             'message': 'Home created successfully',
-            'home': home.to_dict()
+            'home': home.to_dict(stringify_ids=False)
         }), 201
         
     except Exception as e:
@@ -73,7 +79,7 @@ def get_home(home_id):
             return jsonify({'message': 'Access denied'}), 403
         
         return jsonify({
-            'home': home.to_dict()
+            'home': home.to_dict(stringify_ids=False)
         }), 200
         
     except Exception as e:
@@ -112,7 +118,7 @@ def update_home(home_id):
         
         return jsonify({
             'message': 'Home updated successfully',
-            'home': home.to_dict()
+            'home': home.to_dict(stringify_ids=False)
         }), 200
         
     except Exception as e:
@@ -229,7 +235,7 @@ def invite_user_to_home(home_id):
         
         return jsonify({
             'message': 'Invitation sent successfully',
-            'invitation': invitation.to_dict()
+            'invitation': invitation.to_dict(stringify_ids=False)
         }), 201
         
     except Exception as e:
@@ -255,12 +261,12 @@ def request_join_home(home_id):
             return jsonify({'message': 'You are already a member of this home'}), 400
         
         # Get user's email
-        user = User.find_by_id(user_id)
+        user = User.find_by_id(user_id, fields=('email',))
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
         # Get home creator's email for the invitation
-        creator = User.find_by_id(home.data['creator_id'])
+        creator = User.find_by_id(home.data['creator_id'], fields=('email',))
         if not creator:
             return jsonify({'message': 'Home creator not found'}), 404
         
@@ -284,7 +290,7 @@ def request_join_home(home_id):
         
         return jsonify({
             'message': 'Join request sent successfully',
-            'invitation': invitation.to_dict()
+            'invitation': invitation.to_dict(stringify_ids=False)
         }), 201
         
     except Exception as e:
@@ -305,19 +311,16 @@ def get_home_members(home_id):
         if not home.is_member(user_id):
             return jsonify({'message': 'Access denied'}), 403
         
-        # Get member details
+        # Get member details (one query, in member order)
         members = []
-        for member_id in home.data['members']:
-            member = User.find_by_id(str(member_id))
-            if member:
-                member_data = {
-                    'id': member.id,
-                    'name': member.data['name'],
-                    'email': member.data['email'],
-                    'photo': member.data.get('photo'),
-                    'is_creator': str(member_id) == str(home.data['creator_id'])
-                }
-                members.append(member_data)
+        for member in home.get_members():
+            members.append({
+                'id': member.id,
+                'name': member.data['name'],
+                'email': member.data['email'],
+                'photo': member.photo_url('small'),
+                'is_creator': member.id == str(home.data['creator_id'])
+            })
         
         return jsonify({
             'members': members
@@ -364,19 +367,25 @@ def get_user_invitations():
         user_id = get_jwt_identity()
         
         # Get user's email
-        user = User.find_by_id(user_id)
+        user = User.find_by_id(user_id, fields=('email',))
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
         invitations = HomeInvitation.find_pending_for_user(user_id, user.data['email'])
         
+        # One lookup per collection for all invitations
+        homes = Home.find_by_ids({invitation.data['home_id'] for invitation in invitations})
+        senders = User.find_many(
+            {invitation.data['from_user_id'] for invitation in invitations}, fields=PUBLIC_PROFILE_FIELDS
+        )
+        
         # Enrich invitations with home and user data
         enriched_invitations = []
         for invitation in invitations:
             invitation_dict = invitation.to_dict()
             
             # Add home information
-            home = Home.find_by_id(invitation_dict['home_id'])
+            home = homes.get(invitation_dict['home_id'])
             if home:
                 invitation_dict['home'] = {
                     'id': home.id,
@@ -386,7 +395,7 @@ def get_user_invitations():
                 }
             
             # Add sender information
-            sender = User.find_by_id(invitation_dict['from_user_id'])
+            sender = senders.get(invitation_dict['from_user_id'])
             if sender:
                 invitation_dict['from_user'] = {
                     'id': sender.id,
@@ -422,7 +431,7 @@ def respond_to_invitation(invitation_id):
             return jsonify({'message': 'Invitation not found'}), 404
         
         # Get user's email to verify invitation is for them
-        user = User.find_by_id(user_id)
+        user = User.find_by_id(user_id, fields=('email',))
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
@@ -468,30 +477,32 @@ def get_pending_requests():
         
         # Get homes created by this user
         user_homes = Home.find_by_creator_id(user_id)
+        homes = {home.id: home for home in user_homes}
+        
+        # Join requests (not invites) for all of them, then their requesters, in one query each
+        requests = HomeInvitation.find_pending_for_homes([home.data['_id'] for home in user_homes], 'request')
+        requesters = User.find_many({request.data['from_user_id'] for request in requests}, fields=PUBLIC_PROFILE_FIELDS)
         
         pending_requests = []
-        for home in user_homes:
-            requests = HomeInvitation.find_pending_for_home(home.id)
+        for request in requests:
+            request_dict = request.to_dict()
+            home = homes[request_dict['home_id']]
+            request_dict['home'] = {
+                'id': home.id,
+                'name': home.data['name'],
+                'description': home.data.get('description', '')
+            }
+            
+            # Add requester information
+            requester = requesters.get(request_dict['from_user_id'])
+            if requester:
+                request_dict['from_user'] = {
+                    'id': requester.id,
+                    'name': requester.data['name'],
+                    'email': requester.data['email']
+                }
             
-            for request in requests:
-                if request.data['type'] == 'request':  # Only join requests, not invites
-                    request_dict = request.to_dict()
-                    request_dict['home'] = {
-                        'id': home.id,
-                        'name': home.data['name'],
-                        'description': home.data.get('description', '')
-                    }
-                    
-                    # Add requester information
-                    requester = User.find_by_id(request_dict['from_user_id'])
-                    if requester:
-                        request_dict['from_user'] = {
-                            'id': requester.id,
-                            'name': requester.data['name'],
-                            'email': requester.data['email']
-                        }
-                    
-                    pending_requests.append(request_dict)
+            pending_requests.append(request_dict)
         
         return jsonify({
             'requests': pending_requests
@@ -0,0 +1,69 @@
+"""
+Flask JSON provider that encodes BSON types natively
+Uses orjson when it is installed and falls back to the standard library
+encoder otherwise; both produce the same JSON for our payloads
+"""
+
+from typing import Any
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+
+class BSONJSONProvider(DefaultJSONProvider):
+    """JSON provider for API responses: ObjectIds become strings, datetimes HTTP dates
+
+    to_dict(stringify_ids=False) results can be passed to jsonify as they
+    are, leaving the ObjectId conversion to the encoder.
+    """
+
+    @staticmethod
+    def default(o: Any) -> Any:
+        """Encode types the JSON encoder does not know natively"""
+        if isinstance(o, ObjectId):
+            return str(o)
+        # Dates, UUIDs, dataclasses... as Flask's default provider encodes them
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize obj to a JSON string"""
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """Deserialize a JSON string or bytes"""
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        # orjson.JSONDecodeError is a ValueError, like json's, so Flask's 400 handling still applies
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Any:
+        """Build a JSON response, encoding straight to bytes with orjson"""
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj, pretty=self._pretty()) + b'\n', mimetype=self.mimetype)
+
+    def _pretty(self) -> bool:
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def _encode(self, obj: Any, pretty: bool = False) -> bytes:
+        """Encode with orjson, falling back to the standard encoder for what it rejects (e.g. huge ints)"""
+        # Datetimes go through default() so they keep Flask's HTTP date format
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            dump_args = {'indent': 2} if pretty else {'separators': (',', ':')}
+            return super().dumps(obj, **dump_args).encode('utf-8')
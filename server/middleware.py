@@ -1,9 +1,8 @@
 from functools import wraps
 from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from database import db
-from bson import ObjectId
 from session_manager import SessionManager
+from models import User
 
 def auth_required(f):
     """Decorator to require authentication for protected routes"""
@@ -18,24 +17,16 @@ def auth_required(f):
             if not current_user_id:
                 return jsonify({'message': 'Invalid token'}), 401
             
-            # Get user from database
-            users_collection = db.get_collection('users')
-            user = users_collection.find_one({'_id': ObjectId(current_user_id)})
-            
-            if not user:
+            # Existence check only; handlers load the fields they need
+            if not User.exists(current_user_id):
                 return jsonify({'message': 'User not found'}), 401
             
-            # Update session activity if available
+            # Update session activity if available (written at most once per interval)
             access_jti = jwt_data.get('jti')
             if access_jti:
-                sessions = SessionManager.get_user_sessions(current_user_id)
-                for session in sessions:
-                    if session.get('access_token_jti') == access_jti:
-                        SessionManager.update_session_activity(str(session['_id']))
-                        break
-            
-            # Add user to request context
-            request.current_user = user
+                SessionManager.touch_session_activity(
+                    access_jti, current_app.config['SESSION_ACTIVITY_UPDATE_INTERVAL']
+                )
             
             return f(*args, **kwargs)
         except Exception as e:
@@ -0,0 +1,46 @@
+"""
+Move shopping list items between the embedded and collection storage modes
+
+Usage:
+    python migrate_items.py [--to collection|embedded] [--dry-run]
+
+Lists written while being moved are skipped and reported; run the script
+again to pick them up.
+"""
+
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables before config reads them
+load_dotenv()
+
+from config import config
+from database import db
+from shopping_models import ShoppingList, ITEM_STORAGE_COLLECTION, ITEM_STORAGE_MODES
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move shopping list items between storage modes')
+    parser.add_argument('--to', choices=ITEM_STORAGE_MODES, default=ITEM_STORAGE_COLLECTION,
+                        help='target storage mode (default: collection)')
+    parser.add_argument('--dry-run', action='store_true', help='only count the lists that would be moved')
+    args = parser.parse_args()
+
+    app_config = config[os.environ.get('FLASK_ENV', 'development')]
+    db.initialize(app_config.MONGO_URI, app_config.DATABASE_NAME)
+
+    try:
+        result = ShoppingList.migrate_item_storage(args.to, dry_run=args.dry_run)
+        if args.dry_run:
+            print(f"[Migration] {result['pending']} lists would be moved to '{args.to}' item storage")
+        else:
+            print(f"[Migration] Moved {result['migrated']} lists to '{args.to}' item storage, "
+                  f"skipped {result['skipped']} written during the move")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
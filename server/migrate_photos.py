@@ -0,0 +1,44 @@
+"""
+Move base64 profile photos out of user documents into the photo store
+
+Usage:
+    python migrate_photos.py [--dry-run]
+
+Users whose photo changed while being moved are skipped and reported; run
+the script again to pick them up.
+"""
+
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables before config reads them
+load_dotenv()
+
+from config import config
+from database import db
+from models import User
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move inline profile photos to the photo store')
+    parser.add_argument('--dry-run', action='store_true', help='only count the users whose photo would be moved')
+    args = parser.parse_args()
+
+    app_config = config[os.environ.get('FLASK_ENV', 'development')]
+    db.initialize(app_config.MONGO_URI, app_config.DATABASE_NAME)
+
+    try:
+        result = User.migrate_inline_photos(dry_run=args.dry_run)
+        if args.dry_run:
+            print(f"[Migration] {result['pending']} user photos would be moved to the photo store")
+        else:
+            print(f"[Migration] Moved {result['migrated']} user photos to the photo store, "
+                  f"skipped {result['skipped']} changed during the move, {result['failed']} could not be decoded")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,15 @@
 from database import db
+from photo_store import PhotoStore
+import request_cache
 from datetime import datetime, timezone
 from bson import ObjectId
 import bcrypt
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable
 import time
 
+# What other users see of a user: enough for names, emails and avatars
+PUBLIC_PROFILE_FIELDS = ('name', 'email', 'photo', 'photo_id')
+
 def get_unix_timestamp() -> int:
     """Get current Unix timestamp in milliseconds"""
     return int(time.time() * 1000)
@@ -83,11 +88,73 @@ class User:
         return cls(user_data) if user_data else None
     
     @classmethod
-    def find_by_id(cls, user_id: str) -> Optional['User']:
-        """Find user by ID"""
+    def find_by_id(cls, user_id: str, fields: Optional[Iterable[str]] = None) -> Optional['User']:
+        """Find user by ID, optionally loading only the given fields (plus _id)
+        
+        Partially loaded users only hold the requested fields; use them for
+        lookups and enrichment, not for to_dict or updates of other fields.
+        """
+        cached = request_cache.get('user', str(user_id))
+        if cached is not request_cache.MISSING:
+            return cached
+        
+        if fields is not None:
+            fields = frozenset(fields)
+            cached = request_cache.get('user_fields', (str(user_id), fields))
+            if cached is not request_cache.MISSING:
+                return cached
+        
         users_collection = db.get_collection('users')
-        user_data = users_collection.find_one({'_id': ObjectId(user_id)})
-        return cls(user_data) if user_data else None
+        user_data = users_collection.find_one({'_id': ObjectId(user_id)}, cls._projection(fields))
+        user = cls(user_data) if user_data else None
+        if fields is None:
+            return request_cache.put('user', str(user_id), user)
+        return request_cache.put('user_fields', (str(user_id), fields), user)
+    
+    @classmethod
+    def find_many(cls, user_ids: Iterable[Any], fields: Optional[Iterable[str]] = None) -> Dict[str, 'User']:
+        """Find several users by ID with a single query, keyed by string ID
+        
+        Like find_by_id, `fields` loads only the given fields (plus _id).
+        Users already loaded in full during this request are reused.
+        """
+        keys = {str(user_id) for user_id in user_ids if ObjectId.is_valid(user_id)}
+        cached, missing = request_cache.get_many('user', keys)
+        users = {key: user for key, user in cached.items() if user}
+        
+        if fields is not None and missing:
+            fields = frozenset(fields)
+            cached, missing_keys = request_cache.get_many('user_fields', [(key, fields) for key in missing])
+            users.update((key, user) for (key, _), user in cached.items() if user)
+            missing = [key for key, _ in missing_keys]
+        if not missing:
+            return users
+        
+        users_collection = db.get_collection('users')
+        users_data = users_collection.find({'_id': {'$in': [ObjectId(key) for key in missing]}}, cls._projection(fields))
+        for user_data in users_data:
+            key = str(user_data['_id'])
+            if fields is None:
+                users[key] = request_cache.put('user', key, cls(user_data))
+            else:
+                users[key] = request_cache.put('user_fields', (key, fields), cls(user_data))
+        return users
+    
+    @classmethod
+    def exists(cls, user_id: str) -> bool:
+        """Check that a user exists, reading only the _id index"""
+        cached = request_cache.get('user', str(user_id))
+        if cached is not request_cache.MISSING:
+            return cached is not None
+        
+        if not ObjectId.is_valid(user_id):
+            return False
+        users_collection = db.get_collection('users')
+        return users_collection.find_one({'_id': ObjectId(user_id)}, {'_id': 1}) is not None
+    
+    @staticmethod
+    def _projection(fields: Optional[frozenset]) -> Optional[Dict[str, int]]:
+        return None if fields is None else dict.fromkeys(fields, 1)
     
     @classmethod
     def find_by_google_id(cls, google_id: str) -> Optional['User']:
@@ -118,6 +185,7 @@ class User:
             {'_id': self.data['_id']},
             {'$set': update_data}
         )
+        self._invalidate_cached()
         
         # Update local data
         self.data.update(update_data)
@@ -131,10 +199,67 @@ class User:
             {'_id': self.data['_id']},
             {'$set': update_data}
         )
+        self._invalidate_cached()
         
         # Update local data
         self.data.update(update_data)
     
+    def _invalidate_cached(self) -> None:
+        """Drop this user's cached lookups from the request identity map"""
+        request_cache.invalidate('user', self.id)
+        request_cache.invalidate('user_fields')
+    
+    def set_photo(self, photo_id: Optional[str], photo_url: Optional[str] = None) -> None:
+        """Use a stored photo (photo_id) or an external URL, releasing the previous stored photo"""
+        previous_photo_id = self.data.get('photo_id')
+        self.update({'photo_id': photo_id, 'photo': photo_url})
+        if photo_id:
+            PhotoStore.settle(photo_id)
+        
+        if previous_photo_id and previous_photo_id != photo_id:
+            PhotoStore.release(previous_photo_id)
+    
+    def photo_url(self, size: str = 'medium') -> Optional[str]:
+        """Get the URL of the user's photo: a stored photo at the given size, else the external URL"""
+        photo_id = self.data.get('photo_id')
+        if photo_id:
+            return PhotoStore.url(photo_id, size)
+        return self.data.get('photo')
+    
+    @classmethod
+    def migrate_inline_photos(cls, dry_run: bool = False) -> Dict[str, int]:
+        """Move base64 photos stored in user documents to the photo store
+        
+        Users whose photo changed while being moved are skipped; photos that
+        cannot be decoded are left in place and counted as failed.
+        """
+        users_collection = db.get_collection('users')
+        query = {'photo': {'$regex': '^data:image/'}}
+        if dry_run:
+            return {'pending': users_collection.count_documents(query)}
+        
+        result = {'migrated': 0, 'skipped': 0, 'failed': 0}
+        for user_data in users_collection.find(query, {'photo': 1, 'photo_id': 1}):
+            photo_id = user_data.get('photo_id')
+            saved = not photo_id
+            if saved:
+                try:
+                    photo_id = PhotoStore.save(*PhotoStore.decode_data_url(user_data['photo']))
+                except ValueError as e:
+                    print(f"[Database] Could not move photo of user {user_data['_id']}: {e}")
+                    result['failed'] += 1
+                    continue
+            
+            update_result = users_collection.update_one(
+                {'_id': user_data['_id'], 'photo': user_data['photo']},
+                {'$set': {'photo_id': photo_id, 'photo': None, 'updatedAt': get_unix_timestamp()}}
+            )
+            if saved:
+                PhotoStore.settle(photo_id)
+            result['migrated' if update_result.modified_count else 'skipped'] += 1
+        
+        return result
+    
     def to_dict(self, include_sensitive: bool = False) -> Dict[str, Any]:
         """Convert user to dictionary for API responses"""
         user_dict = {
@@ -143,7 +268,7 @@ class User:
             'username': self.data['username'],
             'name': self.data['name'],
             'provider': self.data['provider'],
-            'photo': self.data.get('photo'),
+            'photo': self.photo_url(),
             'preferences': self.data.get('preferences', {}),
             'createdAt': self.data['createdAt'],
             'updatedAt': self.data['updatedAt']
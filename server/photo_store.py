@@ -0,0 +1,224 @@
+"""
+Content-addressed profile photo storage in GridFS
+Each distinct image is stored once under the SHA-256 of its bytes, together
+with thumbnails resized at upload; user documents only keep the photo ID
+"""
+
+import base64
+import hashlib
+import io
+import time
+from typing import Dict, Optional, Tuple
+
+import gridfs
+from flask import has_request_context, url_for
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Optional dependency; without it every size serves the original
+    Image = None
+
+MAX_PHOTO_SIZE = 5 * 1024 * 1024  # 5MB
+PHOTO_BUCKET = 'photos'
+ORIGINAL_SIZE = 'original'
+
+# Thumbnail bounding boxes in pixels
+PHOTO_SIZES = {'small': 64, 'medium': 256}
+THUMBNAIL_JPEG_QUALITY = 85
+
+# A save() holds its photo until settle(); holds older than this, left by
+# requests that failed before their user update, no longer keep it (seconds)
+SAVE_LEASE = 60
+# How long save() waits for a concurrent release of the same photo (seconds)
+RELEASE_WAIT = 5
+
+
+class PhotoStore:
+    """Photos in the 'photos' GridFS bucket, one file per (photo ID, size)"""
+
+    @staticmethod
+    def _bucket() -> gridfs.GridFSBucket:
+        return gridfs.GridFSBucket(db.db, bucket_name=PHOTO_BUCKET)
+
+    @staticmethod
+    def _files():
+        return db.get_collection(f"{PHOTO_BUCKET}.files")
+
+    @staticmethod
+    def _file_id(photo_id: str, size: str) -> str:
+        return f"{photo_id}-{size}"
+
+    @staticmethod
+    def decode_data_url(data_url: str) -> Tuple[str, bytes]:
+        """Decode a 'data:image/...;base64,...' URL into (content type, bytes)
+
+        Raises ValueError with a message for the client when the data is not
+        a base64 image or exceeds MAX_PHOTO_SIZE.
+        """
+        if not isinstance(data_url, str) or not data_url.startswith('data:image/'):
+            raise ValueError('Invalid photo format')
+
+        try:
+            header, base64_data = data_url.split(',', 1)
+            photo_bytes = base64.b64decode(base64_data)
+        except Exception:
+            raise ValueError('Invalid base64 photo data')
+        if not photo_bytes:
+            raise ValueError('Invalid base64 photo data')
+
+        if len(photo_bytes) > MAX_PHOTO_SIZE:
+            raise ValueError('Photo size exceeds 5MB limit')
+
+        content_type = header[len('data:'):].split(';', 1)[0]
+        return content_type, photo_bytes
+
+    @classmethod
+    def _hold(cls, photo_id: str) -> bool:
+        """Keep a stored photo from release() until settle(), unless it is being released; returns whether it is held"""
+        result = cls._files().update_one(
+            {'_id': cls._file_id(photo_id, ORIGINAL_SIZE), 'metadata.releasing': {'$exists': False}},
+            {'$inc': {'metadata.pending': 1}, '$set': {'metadata.saved_at': time.time()}}
+        )
+        return result.matched_count > 0
+
+    @classmethod
+    def settle(cls, photo_id: str) -> None:
+        """Drop the hold of a save() once a user refers to the photo"""
+        cls._files().update_one(
+            {'_id': cls._file_id(photo_id, ORIGINAL_SIZE), 'metadata.pending': {'$gt': 0}},
+            {'$inc': {'metadata.pending': -1}}
+        )
+
+    @classmethod
+    def save(cls, content_type: str, photo_bytes: bytes) -> str:
+        """Store a photo and its thumbnails unless already stored; returns the photo ID
+
+        The photo is held until settle(), so point a user at it and then
+        settle it. A photo that is being released is stored again once the
+        release is done.
+        """
+        photo_id = hashlib.sha256(photo_bytes).hexdigest()
+        deadline = time.time() + RELEASE_WAIT
+        while cls.exists(photo_id):
+            if cls._hold(photo_id):
+                return photo_id
+            if time.time() > deadline:
+                break
+            time.sleep(0.05)
+
+        # The original goes last, so exists() only sees complete photos
+        variants = list(cls._thumbnails(photo_bytes).items()) + [(ORIGINAL_SIZE, (content_type, photo_bytes))]
+        bucket = cls._bucket()
+        for size, (variant_type, data) in variants:
+            file_id = cls._file_id(photo_id, size)
+            metadata = {'contentType': variant_type, 'photo_id': photo_id, 'size': size}
+            if size == ORIGINAL_SIZE:
+                metadata.update(pending=1, saved_at=time.time())
+            try:
+                bucket.upload_from_stream_with_id(file_id, file_id, data, metadata=metadata)
+            except DuplicateKeyError:
+                # Stored concurrently by another upload of the same image
+                if size == ORIGINAL_SIZE:
+                    cls._hold(photo_id)
+
+        print(f"[PhotoStore] Stored photo {photo_id} ({len(photo_bytes)} bytes, {len(variants) - 1} thumbnails)")
+        return photo_id
+
+    @classmethod
+    def exists(cls, photo_id: str) -> bool:
+        """Check whether a photo is stored"""
+        return cls._files().find_one({'_id': cls._file_id(photo_id, ORIGINAL_SIZE)}, {'_id': 1}) is not None
+
+    @classmethod
+    def open(cls, photo_id: str, size: str = ORIGINAL_SIZE) -> Optional[Tuple[str, bytes]]:
+        """Get (content type, bytes) of a photo size, falling back to the original; None if not stored"""
+        bucket = cls._bucket()
+        for candidate in dict.fromkeys((size, ORIGINAL_SIZE)):
+            try:
+                stream = bucket.open_download_stream(cls._file_id(photo_id, candidate))
+            except gridfs.errors.NoFile:
+                continue
+            return stream.metadata.get('contentType', 'application/octet-stream'), stream.read()
+        return None
+
+    @classmethod
+    def release(cls, photo_id: str) -> bool:
+        """Delete a photo once no user refers to it any more; returns whether it was deleted
+
+        The original is claimed first, in one update whose filter skips
+        photos held by a save(), so a concurrent save() either holds the
+        photo before the claim (and it is kept) or finds it being released
+        and stores it again afterwards. The original's files document goes
+        last, so while it exists the release is not done.
+        """
+        users_collection = db.get_collection('users')
+        if users_collection.find_one({'photo_id': photo_id}, {'_id': 1}):
+            return False
+
+        original_id = cls._file_id(photo_id, ORIGINAL_SIZE)
+        claimed = cls._files().update_one(
+            {
+                '_id': original_id,
+                'metadata.releasing': {'$exists': False},
+                '$or': [
+                    {'metadata.pending': {'$not': {'$gt': 0}}},
+                    {'metadata.saved_at': {'$lt': time.time() - SAVE_LEASE}}
+                ]
+            },
+            {'$set': {'metadata.releasing': True}}
+        )
+        if not claimed.matched_count:
+            return False
+
+        # A user may have been pointed at it between the first check and the claim
+        if users_collection.find_one({'photo_id': photo_id}, {'_id': 1}):
+            cls._files().update_one({'_id': original_id}, {'$unset': {'metadata.releasing': ''}})
+            return False
+
+        bucket = cls._bucket()
+        for size in PHOTO_SIZES:
+            try:
+                bucket.delete(cls._file_id(photo_id, size))
+            except gridfs.errors.NoFile:
+                pass
+        db.get_collection(f"{PHOTO_BUCKET}.chunks").delete_many({'files_id': original_id})
+        cls._files().delete_one({'_id': original_id})
+
+        print(f"[PhotoStore] Deleted unused photo {photo_id}")
+        return True
+
+    @staticmethod
+    def url(photo_id: str, size: str = ORIGINAL_SIZE) -> str:
+        """Get the content-addressed URL of a photo size"""
+        if has_request_context():
+            return url_for('user.get_photo', photo_id=photo_id, size=size, _external=True)
+        return f"/api/user/photos/{photo_id}/{size}"
+
+    @staticmethod
+    def _thumbnails(photo_bytes: bytes) -> Dict[str, Tuple[str, bytes]]:
+        """Resize a photo to each of PHOTO_SIZES; empty without Pillow or for unreadable images"""
+        if Image is None:
+            return {}
+
+        try:
+            image = Image.open(io.BytesIO(photo_bytes))
+            image = ImageOps.exif_transpose(image)  # Phone photos carry their rotation in EXIF
+        except Exception as e:
+            print(f"[PhotoStore] Could not read image for thumbnails: {e}")
+            return {}
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        image_format, content_type = ('PNG', 'image/png') if has_alpha else ('JPEG', 'image/jpeg')
+
+        thumbnails = {}
+        for size, box in PHOTO_SIZES.items():
+            thumbnail = image.copy()
+            thumbnail.thumbnail((box, box))
+            output = io.BytesIO()
+            thumbnail.save(output, image_format, quality=THUMBNAIL_JPEG_QUALITY)
+            thumbnails[size] = (content_type, output.getvalue())
+        return thumbnails
@@ -0,0 +1,73 @@
+"""
+Request-scoped identity map for model lookups
+Keeps each document loaded at most once per request and tracks hit/miss counters
+"""
+
+from flask import g, has_request_context
+from typing import Any, Dict, Iterable, Tuple
+
+# Sentinel for "not cached" so that missing documents (None) can be cached too
+MISSING = object()
+
+
+def _identity_map() -> Dict[str, Any]:
+    """Get the identity map for the current request, creating it on first use"""
+    identity_map = g.get('_identity_map')
+    if identity_map is None:
+        identity_map = {'entries': {}, 'hits': 0, 'misses': 0}
+        g._identity_map = identity_map
+    return identity_map
+
+
+def get(namespace: str, key: Any) -> Any:
+    """Get a cached value, or MISSING when outside a request or not cached yet"""
+    if not has_request_context():
+        return MISSING
+
+    identity_map = _identity_map()
+    value = identity_map['entries'].get(namespace, {}).get(key, MISSING)
+    if value is MISSING:
+        identity_map['misses'] += 1
+    else:
+        identity_map['hits'] += 1
+    return value
+
+
+def get_many(namespace: str, keys: Iterable[Any]) -> Tuple[Dict[Any, Any], list]:
+    """Split keys into cached values and keys that still have to be loaded"""
+    found, missing = {}, []
+    for key in keys:
+        value = get(namespace, key)
+        if value is MISSING:
+            missing.append(key)
+        else:
+            found[key] = value
+    return found, missing
+
+
+def put(namespace: str, key: Any, value: Any) -> Any:
+    """Store a value for the rest of the request and return it"""
+    if has_request_context():
+        _identity_map()['entries'].setdefault(namespace, {})[key] = value
+    return value
+
+
+def invalidate(namespace: str, key: Any = MISSING) -> None:
+    """Drop one cached key, or the whole namespace when no key is given"""
+    if not has_request_context():
+        return
+
+    entries = _identity_map()['entries']
+    if key is MISSING:
+        entries.pop(namespace, None)
+    else:
+        entries.get(namespace, {}).pop(key, None)
+
+
+def stats() -> Dict[str, int]:
+    """Get hit/miss counters for the current request"""
+    if not has_request_context():
+        return {'hits': 0, 'misses': 0}
+
+    identity_map = _identity_map()
+    return {'hits': identity_map['hits'], 'misses': identity_map['misses']}
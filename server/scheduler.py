@@ -0,0 +1,78 @@
+"""
+Lightweight periodic background tasks
+Runs maintenance jobs on daemon threads inside the Flask application context
+"""
+
+import threading
+from typing import Any, Callable, Dict, List
+
+
+class PeriodicTask:
+    """Run a function every `interval` seconds on a daemon thread"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Any], app=None):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.app = app
+        self.last_result = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> Any:
+        """Run the task immediately in the application context and log its result, if any"""
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    self.last_result = self.func()
+            else:
+                self.last_result = self.func()
+            if self.last_result is not None:
+                self._log('info', f"[{self.name}] {self.last_result}")
+        except Exception as e:
+            self._log('error', f"[{self.name}] Task failed: {e}")
+        return self.last_result
+
+    def start(self) -> None:
+        """Start the background thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Ask the background thread to stop after its current run"""
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.run_once()
+
+    def _log(self, level: str, message: str) -> None:
+        if self.app is not None:
+            getattr(self.app.logger, level)(message)
+        else:
+            print(message)
+
+
+_tasks: Dict[str, PeriodicTask] = {}
+
+
+def schedule(app, name: str, interval: float, func: Callable[[], Any]) -> PeriodicTask:
+    """Register and start a periodic task; an interval <= 0 registers it without starting"""
+    task = _tasks.get(name)
+    if task is not None:
+        task.stop()
+
+    task = PeriodicTask(name, interval, func, app)
+    _tasks[name] = task
+    if interval > 0:
+        task.start()
+    return task
+
+
+def get_tasks() -> List[PeriodicTask]:
+    """Get all registered tasks"""
+    return list(_tasks.values())
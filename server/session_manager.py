@@ -5,26 +5,42 @@ Handles token blacklisting, refresh tokens, and session tracking
 
 from database import db
 from datetime import datetime, timedelta, timezone
+import hashlib
+import math
 import secrets
+import threading
+import time
 from typing import Optional, Dict, Any
 from bson import ObjectId
+from ttl_cache import TTLCache
 
 class SessionManager:
     """Manage user sessions and JWT tokens"""
     
-    @staticmethod
-    def create_session(user_id: str, access_token: str, refresh_token: str, 
+    # Sessions live as long as their refresh token
+    _session_lifetime = timedelta(days=30)
+    
+    @classmethod
+    def configure(cls, session_lifetime: Optional[timedelta] = None) -> None:
+        """Configure how long sessions are kept (normally the refresh token lifetime)"""
+        if session_lifetime is not None:
+            cls._session_lifetime = session_lifetime
+    
+    @classmethod
+    def create_session(cls, user_id: str, access_token: str, refresh_token: str, 
                       device_info: Optional[Dict[str, Any]] = None) -> str:
         """Create a new user session"""
         sessions_collection = db.get_collection('user_sessions')
         
+        now = datetime.now(timezone.utc)
         session_data = {
             'user_id': user_id,
             'access_token_jti': access_token,  # JWT ID
             'refresh_token_jti': refresh_token,  # JWT ID
             'device_info': device_info or {},
-            'created_at': datetime.now(timezone.utc),
-            'last_activity': datetime.now(timezone.utc),
+            'created_at': now,
+            'last_activity': now,
+            'expires_at': now + cls._session_lifetime,  # Removed by the TTL index
             'is_active': True
         }
         
@@ -38,6 +54,38 @@ class SessionManager:
         session = sessions_collection.find_one({'_id': ObjectId(session_id)})
         return session
     
+    @staticmethod
+    def find_by_access_token_jti(access_jti: str) -> Optional[Dict[str, Any]]:
+        """Get active session by access token JWT ID (indexed lookup)"""
+        sessions_collection = db.get_collection('user_sessions')
+        return sessions_collection.find_one({'access_token_jti': access_jti, 'is_active': True})
+    
+    @staticmethod
+    def find_by_refresh_token_jti(refresh_jti: str) -> Optional[Dict[str, Any]]:
+        """Get active session by refresh token JWT ID (indexed lookup)"""
+        sessions_collection = db.get_collection('user_sessions')
+        return sessions_collection.find_one({'refresh_token_jti': refresh_jti, 'is_active': True})
+    
+    @staticmethod
+    def touch_session_activity(access_jti: str, min_interval_seconds: int = 0) -> bool:
+        """Update last activity for the session owning an access token.
+        
+        The write is coalesced: the filter only matches when the stored
+        last_activity is older than min_interval_seconds, so most calls are a
+        single indexed lookup that modifies nothing.
+        """
+        sessions_collection = db.get_collection('user_sessions')
+        now = datetime.now(timezone.utc)
+        result = sessions_collection.update_one(
+            {
+                'access_token_jti': access_jti,
+                'is_active': True,
+                'last_activity': {'$lt': now - timedelta(seconds=min_interval_seconds)}
+            },
+            {'$set': {'last_activity': now}}
+        )
+        return result.modified_count > 0
+    
     @staticmethod
     def update_session_activity(session_id: str) -> bool:
         """Update last activity timestamp for session"""
@@ -85,23 +133,124 @@ class SessionManager:
         sessions = list(sessions_collection.find(query).sort('last_activity', -1))
         return sessions
     
-    @staticmethod
-    def cleanup_expired_sessions() -> int:
-        """Remove sessions older than 30 days"""
+    @classmethod
+    def cleanup_expired_sessions(cls) -> int:
+        """Remove expired sessions, including legacy sessions without expires_at"""
         sessions_collection = db.get_collection('user_sessions')
         
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=30)
+        now = datetime.now(timezone.utc)
         result = sessions_collection.delete_many({
-            'created_at': {'$lt': cutoff_date}
+            '$or': [
+                {'expires_at': {'$lt': now}},
+                {'expires_at': None, 'created_at': {'$lt': now - cls._session_lifetime}}
+            ]
         })
         return result.deleted_count
 
 
+class BloomFilter:
+    """Compact probabilistic set of strings: no false negatives, rare false positives"""
+    
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, item: str):
+        """Bit positions for an item using double hashing"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+    
+    def add(self, item: str) -> None:
+        """Add an item to the set"""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
 class TokenBlacklist:
-    """Manage blacklisted JWT tokens"""
+    """Manage blacklisted JWT tokens
     
-    @staticmethod
-    def add_token(jti: str, token_type: str = 'access', expires_at: Optional[datetime] = None) -> bool:
+    Lookups are answered from an in-process bloom filter of revoked JTIs:
+    tokens that are not in the filter are known not to be revoked without
+    touching MongoDB. Filter hits are confirmed against the database and
+    cached for a short TTL. The filter is rebuilt at startup and merged with
+    tokens revoked by other workers every refresh interval.
+    """
+    
+    _refresh_interval = 30
+    _bloom = None
+    _last_refresh = 0.0
+    _synced_until = None
+    _revoked_cache = TTLCache(maxsize=10000, ttl=300)
+    _lock = threading.Lock()
+    
+    @classmethod
+    def configure(cls, refresh_interval: Optional[int] = None, cache_ttl: Optional[int] = None) -> None:
+        """Configure blocklist cache refresh interval and revoked-token TTL (seconds)"""
+        if refresh_interval is not None:
+            cls._refresh_interval = refresh_interval
+        if cache_ttl is not None:
+            cls._revoked_cache = TTLCache(maxsize=10000, ttl=cache_ttl)
+    
+    @classmethod
+    def rebuild_cache(cls) -> int:
+        """Rebuild the bloom filter from all blacklisted tokens, returns token count"""
+        blacklist_collection = db.get_collection('token_blacklist')
+        
+        with cls._lock:
+            total = blacklist_collection.count_documents({})
+            bloom = BloomFilter(capacity=max(100000, total * 2))
+            synced_until = None
+            for token in blacklist_collection.find({}, {'jti': 1, 'blacklisted_at': 1, '_id': 0}):
+                bloom.add(token['jti'])
+                if token.get('blacklisted_at') and (synced_until is None or token['blacklisted_at'] > synced_until):
+                    synced_until = token['blacklisted_at']
+            
+            cls._bloom = bloom
+            cls._synced_until = synced_until
+            cls._last_refresh = time.monotonic()
+            cls._revoked_cache.clear()
+        
+        return bloom.count
+    
+    @classmethod
+    def _refresh_cache_if_due(cls) -> None:
+        """Merge tokens blacklisted by other workers since the last refresh"""
+        if cls._bloom is None or cls._bloom.count > cls._bloom.capacity:
+            cls.rebuild_cache()
+            return
+        
+        if time.monotonic() - cls._last_refresh < cls._refresh_interval:
+            return
+        
+        blacklist_collection = db.get_collection('token_blacklist')
+        
+        with cls._lock:
+            if time.monotonic() - cls._last_refresh < cls._refresh_interval:
+                return  # Another thread refreshed meanwhile
+            
+            query = {}
+            if cls._synced_until is not None:
+                # Overlap by one interval to tolerate clock skew between workers
+                query['blacklisted_at'] = {'$gte': cls._synced_until - timedelta(seconds=cls._refresh_interval)}
+            
+            for token in blacklist_collection.find(query, {'jti': 1, 'blacklisted_at': 1, '_id': 0}):
+                cls._bloom.add(token['jti'])
+                if token.get('blacklisted_at') and (cls._synced_until is None or token['blacklisted_at'] > cls._synced_until):
+                    cls._synced_until = token['blacklisted_at']
+            
+            cls._last_refresh = time.monotonic()
+    
+    @classmethod
+    def add_token(cls, jti: str, token_type: str = 'access', expires_at: Optional[datetime] = None) -> bool:
         """Add token to blacklist"""
         blacklist_collection = db.get_collection('token_blacklist')
         
@@ -118,27 +267,65 @@ class TokenBlacklist:
             {'$set': token_data},
             upsert=True
         )
+        
+        if cls._bloom is not None:
+            cls._bloom.add(jti)
+        cls._revoked_cache.set(jti, True)
         return True
     
-    @staticmethod
-    def is_token_blacklisted(jti: str) -> bool:
+    @classmethod
+    def is_token_blacklisted(cls, jti: str) -> bool:
         """Check if token is blacklisted"""
+        cls._refresh_cache_if_due()
+        
+        if jti not in cls._bloom:
+            return False
+        
+        if cls._revoked_cache.get(jti):
+            return True
+        
+        # Possible false positive: confirm against the database
         blacklist_collection = db.get_collection('token_blacklist')
-        token = blacklist_collection.find_one({'jti': jti})
+        token = blacklist_collection.find_one({'jti': jti}, {'_id': 1})
+        if token is not None:
+            cls._revoked_cache.set(jti, True)
         return token is not None
     
     @staticmethod
-    def cleanup_expired_tokens() -> int:
-        """Remove expired tokens from blacklist"""
+    def cleanup_expired_tokens(legacy_max_age: Optional[timedelta] = None) -> int:
+        """Remove expired tokens from blacklist
+        
+        Tokens blacklisted without expires_at are removed once they are older
+        than legacy_max_age (the longest token lifetime), when given.
+        """
         blacklist_collection = db.get_collection('token_blacklist')
         
         current_time = datetime.now(timezone.utc)
-        result = blacklist_collection.delete_many({
-            'expires_at': {'$lt': current_time}
-        })
+        query = {'expires_at': {'$lt': current_time}}
+        if legacy_max_age is not None:
+            query = {'$or': [
+                query,
+                {'expires_at': None, 'blacklisted_at': {'$lt': current_time - legacy_max_age}}
+            ]}
+        
+        result = blacklist_collection.delete_many(query)
         return result.deleted_count
 
 
+def reap_expired() -> Dict[str, int]:
+    """Remove expired blacklist tokens and sessions, returns removed row counts
+    
+    TTL indexes expire rows on their own; this also catches rows written
+    before expires_at was stored and refreshes the blocklist cache so reaped
+    tokens leave the bloom filter.
+    """
+    removed_tokens = TokenBlacklist.cleanup_expired_tokens(SessionManager._session_lifetime)
+    removed_sessions = SessionManager.cleanup_expired_sessions()
+    TokenBlacklist.rebuild_cache()
+    
+    return {'tokens': removed_tokens, 'sessions': removed_sessions}
+
+
 def generate_device_fingerprint(request) -> Dict[str, Any]:
     """Generate device fingerprint from request headers"""
     return {
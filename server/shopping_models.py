@@ -1,13 +1,191 @@
 from database import db
+import request_cache
 from bson import ObjectId
-from typing import Optional, Dict, Any, List
+from pymongo import ReturnDocument, InsertOne, UpdateOne, DeleteOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+from pymongo.results import BulkWriteResult
+from typing import Optional, Dict, Any, List, Iterable, Tuple
 import time
 
+# Item fields clients may change, and the largest batch accepted by apply_item_ops
+ITEM_FIELDS = ('name', 'quantity', 'category', 'notes', 'completed')
+MAX_ITEM_OPS = 500
+
+# Attempts at applying a write on top of concurrent writes to other fields
+# or items before the version conflict is reported
+MAX_WRITE_ATTEMPTS = 3
+
+# Largest page of lists served by keyset pagination
+MAX_PAGE_SIZE = 200
+
+# Statuses listed when archived lists are included, as point values rather
+# than $ne: 'deleted' so the status indexes return pages in sort order; None
+# matches lists stored before the status field existed
+LISTED_STATUSES = ('active', 'completed', 'archived', None)
+
+# Fields clients can select with fields=, mapped to the stored fields they
+# are built from; creator/home/permissions are added by the routes
+LIST_FIELD_SOURCES = {
+    'name': ('name',),
+    'description': ('description',),
+    'color': ('color',),
+    'status': ('status', 'archived'),
+    'archived': ('archived',),
+    'user_id': ('user_id',),
+    'home_id': ('home_id',),
+    'items': ('items',),
+    'item_count': ('item_count',),
+    'completed_count': ('completed_count',),
+    'version': ('version',),
+    'createdAt': ('createdAt',),
+    'updatedAt': ('updatedAt',),
+    'can_be_completed': ('item_count', 'completed_count'),
+    'completion_percentage': ('item_count', 'completed_count'),
+    'creator': (),
+    'home': (),
+    'permissions': (),
+}
+# Always loaded: needed for permission checks, item loading and pagination cursors
+LIST_KEY_FIELDS = ('user_id', 'home_id', 'item_storage', 'createdAt')
+
+# Where a list keeps its items: embedded in the list document, or one document
+# per item in the shopping_items collection (for lists with many items)
+ITEM_STORAGE_EMBEDDED = 'embedded'
+ITEM_STORAGE_COLLECTION = 'collection'
+ITEM_STORAGE_MODES = (ITEM_STORAGE_EMBEDDED, ITEM_STORAGE_COLLECTION)
+
+# Internal bookkeeping fields left out of API responses
+HIDDEN_LIST_FIELDS = frozenset(('field_versions', 'item_storage'))
+
+# Stored fields a list response depends on besides its enrichment, for ETags
+VALIDATOR_FIELDS = ('updatedAt', 'version', 'user_id', 'home_id')
+
+# List fields that decide what a list contributes to the stats rollups
+STATS_FIELDS = ('user_id', 'home_id', 'status', 'archived', 'item_count', 'completed_count')
+
 def get_unix_timestamp() -> int:
     """Get current Unix timestamp in milliseconds"""
     return int(time.time() * 1000)
 
+class VersionConflictError(Exception):
+    """Raised when a write's expected version no longer matches the stored list"""
+    
+    def __init__(self, current_version: Optional[int], conflicts: Dict[str, Any]):
+        super().__init__(f"Version conflict (current version {current_version})")
+        self.current_version = current_version
+        self.conflicts = conflicts
+
+def _version_filter(expected_version: int) -> Any:
+    """Match an expected version; documents written before versioning count as version 0"""
+    return expected_version if expected_version else {'$in': [0, None]}
+
+def _count_items(items: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Get (item_count, completed_count) for a list of items"""
+    return len(items), sum(1 for item in items if item.get('completed', False) is True)
+
+class ShoppingItems:
+    """Items of collection-mode lists, one shopping_items document per item
+    
+    Documents carry the item fields plus list_id and a position used for
+    ordering; both stay internal and are stripped when items are loaded.
+    """
+    
+    @staticmethod
+    def _collection():
+        return db.get_collection('shopping_items')
+    
+    @classmethod
+    def find_by_list_ids(cls, list_ids: Iterable[Any]) -> Dict[Any, List[Dict[str, Any]]]:
+        """Load the items of several lists in one query, grouped by list ID in display order"""
+        grouped = {list_id: [] for list_id in list_ids}
+        if not grouped:
+            return grouped
+        
+        cursor = cls._collection().find(
+            {'list_id': {'$in': list(grouped)}},
+            {'_id': 0, 'position': 0}
+        ).sort([('list_id', 1), ('position', 1), ('_id', 1)])
+        
+        for item in cursor:
+            grouped[item.pop('list_id')].append(item)
+        return grouped
+    
+    @classmethod
+    def find_state(cls, list_id: Any) -> List[Dict[str, Any]]:
+        """Load only id, version and completed of a list's items, in display order"""
+        return list(cls._collection().find(
+            {'list_id': list_id},
+            {'_id': 0, 'id': 1, 'version': 1, 'completed': 1}
+        ).sort([('position', 1), ('_id', 1)]))
+    
+    @classmethod
+    def insert_many(cls, list_id: Any, items: List[Dict[str, Any]], start_position: int = 0) -> None:
+        """Insert items for a list, positioned after start_position"""
+        documents = [
+            dict(item, list_id=list_id, position=start_position + index)
+            for index, item in enumerate(items)
+        ]
+        if documents:
+            cls._collection().insert_many(documents)
+    
+    @classmethod
+    def update_one(cls, list_id: Any, item_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Set fields on one item and bump its version; returns its previous completed state"""
+        return cls._collection().find_one_and_update(
+            {'list_id': list_id, 'id': item_id},
+            {'$set': fields, '$inc': {'version': 1}},
+            projection={'_id': 0, 'completed': 1}
+        )
+    
+    @classmethod
+    def delete_one(cls, list_id: Any, item_id: str) -> Optional[Dict[str, Any]]:
+        """Delete one item; returns its completed state, or None if it did not exist"""
+        return cls._collection().find_one_and_delete(
+            {'list_id': list_id, 'id': item_id},
+            projection={'_id': 0, 'completed': 1}
+        )
+    
+    @classmethod
+    def bulk_write(cls, writes: List[Any]) -> Optional[BulkWriteResult]:
+        """Apply item writes in order; returns None when there was nothing to write"""
+        if writes:
+            return cls._collection().bulk_write(writes, ordered=True)
+        return None
+    
+    @classmethod
+    def count(cls, list_id: Any) -> Tuple[int, int]:
+        """Count a list's stored items as (item_count, completed_count)"""
+        return (
+            cls._collection().count_documents({'list_id': list_id}),
+            cls._collection().count_documents({'list_id': list_id, 'completed': True})
+        )
+    
+    @classmethod
+    def replace(cls, list_id: Any, items: List[Dict[str, Any]]) -> None:
+        """Replace all items of a list"""
+        cls.delete_for_list(list_id)
+        cls.insert_many(list_id, items)
+    
+    @classmethod
+    def delete_for_list(cls, list_id: Any) -> None:
+        """Delete all items of a list"""
+        cls._collection().delete_many({'list_id': list_id})
+    
+    @staticmethod
+    def with_ids(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Give items without an id (or with a duplicate one) a fresh id, as the collection requires"""
+        seen, result = set(), []
+        for item in items:
+            if not item.get('id') or item['id'] in seen:
+                item = dict(item, id=str(ObjectId()))
+            seen.add(item['id'])
+            result.append(item)
+        return result
+
 class ShoppingList:
+    # Storage mode for newly created lists, set from config at startup
+    _item_storage = ITEM_STORAGE_EMBEDDED
+    
     def __init__(self, data: Dict[str, Any]):
         self.data = data
     
@@ -15,6 +193,17 @@ class ShoppingList:
     def id(self) -> str:
         return str(self.data['_id'])
     
+    @classmethod
+    def configure(cls, item_storage: str = ITEM_STORAGE_EMBEDDED) -> None:
+        """Set the item storage mode used for new lists"""
+        if item_storage not in ITEM_STORAGE_MODES:
+            raise ValueError(f"Invalid item storage: {item_storage}. Must be one of {list(ITEM_STORAGE_MODES)}")
+        cls._item_storage = item_storage
+    
+    def uses_item_collection(self) -> bool:
+        """Check if the list keeps its items in the shopping_items collection"""
+        return self.data.get('item_storage') == ITEM_STORAGE_COLLECTION
+    
     @classmethod
     def create(cls, user_id: str, name: str, description: str = "", color: str = "#1976d2", list_id: str = None, items: List[Dict[str, Any]] = None, home_id: str = None) -> 'ShoppingList':
         """Create a new shopping list with optional custom ID and items"""
@@ -29,6 +218,7 @@ class ShoppingList:
             'status': 'active',  # New status field: active, completed, archived, deleted
             'home_id': ObjectId(home_id) if home_id else None,  # Optional home association
             'items': items or [],  # Use provided items or empty list
+            'version': 1,  # Incremented on every write, checked for optimistic concurrency
             'createdAt': get_unix_timestamp(),
             'updatedAt': get_unix_timestamp()
         }
@@ -37,6 +227,15 @@ class ShoppingList:
         if list_id:
             list_data['_id'] = list_id
         
+        # Counters are kept up to date by every item write
+        list_data['item_count'], list_data['completed_count'] = _count_items(list_data['items'])
+        
+        # Collection-mode lists store their items separately
+        items = None
+        if cls._item_storage == ITEM_STORAGE_COLLECTION:
+            items = ShoppingItems.with_ids(list_data.pop('items'))
+            list_data['item_storage'] = ITEM_STORAGE_COLLECTION
+        
         print(f"[ShoppingList.create] List data prepared: {list_data}")
         
         shopping_lists_collection = db.get_collection('shopping_lists')
@@ -45,113 +244,429 @@ class ShoppingList:
         result = shopping_lists_collection.insert_one(list_data)
         print(f"[ShoppingList.create] Insert result: {result.inserted_id}")
         
+        request_cache.invalidate('shopping_list')
+        
         # If we didn't provide custom ID, use the generated one
         if not list_id:
             list_data['_id'] = result.inserted_id
         
+        if items is not None:
+            ShoppingItems.insert_many(list_data['_id'], items)
+            list_data['items'] = items
+        
+        StatsRollup.record_change(None, list_data)
+        
         print(f"[ShoppingList.create] Final list data: {list_data}")
         
         return cls(list_data)
     
     @classmethod
-    def find_by_user_id(cls, user_id: str, include_archived: bool = False, home_id: str = None) -> List['ShoppingList']:
-        """Find all shopping lists for a user, including home lists they have access to"""
-        shopping_lists_collection = db.get_collection('shopping_lists')
-        
+    def _build_access_query(cls, user_id: str, include_archived: bool = False, home_id: str = None) -> Dict[str, Any]:
+        """Build the filter for lists a user can see, optionally limited to one home"""
         if home_id:
             # Find lists for a specific home
             query = {
                 'home_id': ObjectId(home_id) if home_id != 'personal' else None,
-                'status': {'$ne': 'deleted'}
+                'status': {'$in': list(LISTED_STATUSES)}
             }
             if not include_archived:
                 query['status'] = 'active'
         else:
             # Find user's personal lists + all home lists they have access to
             from home_models import Home
-            user_homes = Home.find_by_user_id(user_id)
-            home_ids = [ObjectId(home.id) for home in user_homes]
+            home_ids = Home.find_ids_by_user_id(user_id)
             
             query = {
                 '$or': [
                     {'user_id': ObjectId(user_id)},  # Personal lists
                     {'home_id': {'$in': home_ids}}   # Home lists
                 ],
-                'status': {'$ne': 'deleted'}
+                'status': {'$in': list(LISTED_STATUSES)}
             }
             if not include_archived:
                 query['status'] = 'active'
         
-        lists_data = list(shopping_lists_collection.find(query).sort('createdAt', 1))
-        return [cls(list_data) for list_data in lists_data]
+        return query
+    
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> Optional[frozenset]:
+        """Parse a comma-separated fields= parameter; None selects everything"""
+        if not fields:
+            return None
+        
+        selected = frozenset(field.strip() for field in fields.split(',') if field.strip())
+        unknown = selected - set(LIST_FIELD_SOURCES)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return selected
+    
+    @staticmethod
+    def _projection(fields: Optional[frozenset] = None, summary: bool = False) -> Optional[Dict[str, int]]:
+        """Build the Mongo projection for a field selection, leaving out items in summary mode"""
+        if fields is None:
+            return {'items': 0} if summary else None
+        
+        stored = set(LIST_KEY_FIELDS)
+        for field in fields:
+            stored.update(LIST_FIELD_SOURCES[field])
+        if summary:
+            stored.discard('items')
+        return dict.fromkeys(stored, 1)
+    
+    @classmethod
+    def find_by_user_id(cls, user_id: str, include_archived: bool = False, home_id: str = None,
+                        after: Optional[Tuple[int, Any]] = None, limit: Optional[int] = None,
+                        summary: bool = False, fields: Optional[frozenset] = None) -> List['ShoppingList']:
+        """Find all shopping lists for a user, including home lists they have access to
+        
+        Lists are sorted by (createdAt, _id). For keyset pagination pass the
+        (createdAt, _id) key of the last list already seen as `after` and a
+        page size as `limit`. Summary mode leaves out the items, and `fields`
+        (see parse_fields) loads only what the selected fields need.
+        """
+        projection = cls._projection(fields, summary)
+        cursor = cls._find_page(user_id, include_archived, home_id, after, limit, projection)
+        
+        shopping_lists = [cls(list_data) for list_data in cursor]
+        if projection is not None and projection.get('items') != 1:
+            return shopping_lists
+        return cls._attach_items(shopping_lists)
+    
+    @classmethod
+    def find_validators(cls, user_id: str, include_archived: bool = False, home_id: str = None,
+                        after: Optional[Tuple[int, Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get only the VALIDATOR_FIELDS of the lists find_by_user_id would return"""
+        projection = dict.fromkeys(VALIDATOR_FIELDS, 1)
+        return list(cls._find_page(user_id, include_archived, home_id, after, limit, projection))
+    
+    @classmethod
+    def _find_page(cls, user_id: str, include_archived: bool, home_id: Optional[str],
+                   after: Optional[Tuple[int, Any]], limit: Optional[int], projection: Optional[Dict[str, int]]):
+        """Get a cursor over one page of the user's lists in (createdAt, _id) order"""
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        
+        query = cls._build_access_query(user_id, include_archived, home_id)
+        if after is not None:
+            created_at, list_id = after
+            query['createdAt'] = {'$gte': created_at}
+            query['$nor'] = [cls._seen_on_same_timestamp(created_at, list_id)]
+        
+        cursor = shopping_lists_collection.find(query, projection)
+        cursor = cursor.sort([('createdAt', 1), ('_id', 1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+    
+    @staticmethod
+    def _seen_on_same_timestamp(created_at: int, list_id: Any) -> Dict[str, Any]:
+        """Match lists sorted at or before (created_at, list_id)
+        
+        Range operators only compare _ids of the same BSON type, and custom
+        string IDs sort before ObjectIds, so those are matched explicitly.
+        """
+        if isinstance(list_id, ObjectId):
+            return {'createdAt': created_at, '$or': [{'_id': {'$type': 'string'}}, {'_id': {'$lte': list_id}}]}
+        return {'createdAt': created_at, '_id': {'$lte': list_id}}
+    
+    @classmethod
+    def parse_cursor(cls, cursor: str) -> Tuple[int, Any]:
+        """Parse a '<createdAt>,<_id>' pagination cursor; raises ValueError when malformed"""
+        created_at, separator, list_id = cursor.partition(',')
+        if not separator or not list_id:
+            raise ValueError("Cursor must be '<createdAt>,<_id>'")
+        return int(created_at), cls._to_query_id(list_id)
+    
+    def cursor(self) -> str:
+        """Get the pagination cursor pointing just after this list"""
+        return f"{self.data.get('createdAt', 0)},{self.id}"
+    
+    @classmethod
+    def find_sync_timestamps(cls, user_id: str, include_archived: bool = False) -> List[Dict[str, Any]]:
+        """Get only _id and updatedAt of the user's lists (index-only scan, no items)"""
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        
+        query = cls._build_access_query(user_id, include_archived)
+        
+        return list(shopping_lists_collection.find(query, {'_id': 1, 'updatedAt': 1}))
+    
+    @classmethod
+    def find_changed_since(cls, user_id: str, since: int, deleted_since: Optional[int] = None) -> List['ShoppingList']:
+        """Find accessible lists of any status updated at or after a Unix timestamp (ms)
+        
+        Lists of homes whose membership changed since then (e.g. the user just
+        joined) are included in full, since their own updatedAt may be older.
+        Deleted lists are left out when deleted before deleted_since, if given.
+        """
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        
+        from home_models import Home
+        home_ids = Home.find_ids_by_user_id(user_id)
+        changed_home_ids = Home.find_ids_updated_since(home_ids, since)
+        
+        # Any status: deleted lists are needed for tombstones
+        query = {'$or': [
+            {'user_id': ObjectId(user_id), 'updatedAt': {'$gte': since}},
+            {'home_id': {'$in': home_ids}, 'updatedAt': {'$gte': since}},
+            {'home_id': {'$in': changed_home_ids}}
+        ]}
+        if deleted_since is not None and deleted_since > since:
+            query['$nor'] = [{'status': 'deleted', 'updatedAt': {'$lt': deleted_since}}]
+        
+        lists_data = list(shopping_lists_collection.find(query).sort('updatedAt', 1))
+        return cls._attach_items([cls(list_data) for list_data in lists_data])
     
     @classmethod
-    def find_by_id(cls, list_id: str, user_id: str = None) -> Optional['ShoppingList']:
-        """Find shopping list by ID with optional user permission check"""
+    def _attach_items(cls, shopping_lists: List['ShoppingList']) -> List['ShoppingList']:
+        """Load items of collection-mode lists with one query for all of them"""
+        pending = [sl for sl in shopping_lists if sl.uses_item_collection() and 'items' not in sl.data]
+        if pending:
+            items_by_list = ShoppingItems.find_by_list_ids(sl.data['_id'] for sl in pending)
+            for sl in pending:
+                sl.data['items'] = items_by_list[sl.data['_id']]
+        return shopping_lists
+    
+    @classmethod
+    def find_accessible_ids(cls, user_id: str, list_ids: List[str]) -> List[str]:
+        """Filter list IDs down to lists the user can still access (any status but deleted)"""
+        if not list_ids:
+            return []
+        
         shopping_lists_collection = db.get_collection('shopping_lists')
         
+        query = cls._build_access_query(user_id, include_archived=True)
+        query['_id'] = {'$in': [cls._to_query_id(list_id) for list_id in list_ids]}
+        
+        return [str(list_data['_id']) for list_data in shopping_lists_collection.find(query, {'_id': 1})]
+    
+    @staticmethod
+    def _to_query_id(list_id: str) -> Any:
+        """Convert a list ID to its stored form (ObjectId or custom string ID)"""
         # Handle both MongoDB ObjectIds and custom frontend-generated IDs
-        if ObjectId.is_valid(list_id):
-            # Traditional MongoDB ObjectId
-            query_id = ObjectId(list_id)
-        else:
-            # Custom frontend-generated ID (string)
-            query_id = list_id
+        return ObjectId(list_id) if ObjectId.is_valid(list_id) else list_id
+    
+    @classmethod
+    def find_by_id(cls, list_id: str, user_id: str = None, fields: Optional[frozenset] = None) -> Optional['ShoppingList']:
+        """Find shopping list by ID with optional user permission check and field selection"""
+        cache_key = (str(list_id), user_id, fields)
+        cached = request_cache.get('shopping_list', cache_key)
+        if cached is not request_cache.MISSING:
+            return cached
+        
+        shopping_lists_collection = db.get_collection('shopping_lists')
         
-        query = {'_id': query_id}
+        projection = cls._projection(fields)
+        list_data = shopping_lists_collection.find_one(cls._id_query(list_id, user_id), projection)
+        shopping_list = None
+        if list_data:
+            shopping_list = cls(list_data)
+            if projection is None or projection.get('items') == 1:
+                cls._attach_items([shopping_list])
+        return request_cache.put('shopping_list', cache_key, shopping_list)
+    
+    @classmethod
+    def find_validator(cls, list_id: str, user_id: str = None) -> Optional[Dict[str, Any]]:
+        """Get only the VALIDATOR_FIELDS of the list find_by_id would return"""
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        return shopping_lists_collection.find_one(cls._id_query(list_id, user_id), dict.fromkeys(VALIDATOR_FIELDS, 1))
+    
+    @classmethod
+    def _id_query(cls, list_id: str, user_id: str = None) -> Dict[str, Any]:
+        """Build the query for one list, limited to lists the user can access when user_id is given"""
+        query = {'_id': cls._to_query_id(list_id)}
         
         # If user_id provided, check permissions
         if user_id:
             from home_models import Home
-            user_homes = Home.find_by_user_id(user_id)
-            home_ids = [ObjectId(home.id) for home in user_homes]
+            home_ids = Home.find_ids_by_user_id(user_id)
             
             query['$or'] = [
                 {'user_id': ObjectId(user_id)},  # User owns the list
                 {'home_id': {'$in': home_ids}}   # User has access through home
             ]
-        
-        list_data = shopping_lists_collection.find_one(query)
-        return cls(list_data) if list_data else None
+        return query
+    
+    def _invalidate_cached(self) -> None:
+        """Drop cached lookups of shopping lists from the request identity map"""
+        request_cache.invalidate('shopping_list')
     
-    def update(self, update_data: Dict[str, Any]) -> None:
-        """Update shopping list"""
+    def update(self, update_data: Dict[str, Any], expected_version: Optional[int] = None) -> None:
+        """Update shopping list
+        
+        When expected_version is given the write only applies if the stored
+        version still matches; otherwise VersionConflictError is raised with
+        the server values of the conflicting fields. A write whose fields
+        were not changed since expected_version is applied on top of the
+        concurrent writes, at most MAX_WRITE_ATTEMPTS times in all.
+        """
         update_data['updatedAt'] = get_unix_timestamp()
         
+        query = {'_id': self.data['_id']}
+        if expected_version is not None:
+            query['version'] = _version_filter(expected_version)
+        
+        stored_data = dict(update_data)
+        items = None
+        if 'items' in update_data:
+            stored_data['item_count'], stored_data['completed_count'] = _count_items(update_data['items'])
+            
+            # Collection-mode lists only store the counts; items are replaced after the version check
+            if self.uses_item_collection():
+                items = ShoppingItems.with_ids(stored_data.pop('items'))
+                update_data['items'] = items
+        
+        # Bump the version and remember it per written field, so a later stale
+        # write can tell which fields actually changed since its version
+        set_fields = {field: {'$literal': value} for field, value in stored_data.items()}
+        if 'items' in stored_data:
+            set_fields['items'] = self._versioned_items_expression(stored_data['items'])
+        pipeline = [{'$set': dict(set_fields, version={'$add': [{'$ifNull': ['$version', 0]}, 1]})}]
+        versioned_fields = [field for field in update_data if field != 'updatedAt']
+        if versioned_fields:
+            pipeline.append({'$set': {f'field_versions.{field}': '$version' for field in versioned_fields}})
+        
+        # The previous state gives exact deltas for the stats rollups, and the
+        # previous items the versions the pipeline gave the written ones
+        projection = dict.fromkeys(STATS_FIELDS + ('version',), 1)
+        if 'items' in stored_data:
+            projection['items'] = 1
         shopping_lists_collection = db.get_collection('shopping_lists')
-        shopping_lists_collection.update_one(
-            {'_id': self.data['_id']},
-            {'$set': update_data}
-        )
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            result = shopping_lists_collection.find_one_and_update(
+                query,
+                pipeline,
+                projection=projection,
+                return_document=ReturnDocument.BEFORE
+            )
+            self._invalidate_cached()
+            if result is not None or expected_version is None:
+                break
+            
+            conflict = self._version_conflict(update_data, expected_version)
+            if conflict.conflicts or conflict.current_version is None:
+                raise conflict
+            # Concurrent writes only touched other fields: apply on top of them
+            expected_version = conflict.current_version
+            query['version'] = _version_filter(expected_version)
+        else:
+            raise conflict
+        
+        if items is not None and result is not None:
+            stored_items = ShoppingItems.find_by_list_ids([self.data['_id']])[self.data['_id']]
+            items = self._versioned_items(items, stored_items)
+            ShoppingItems.replace(self.data['_id'], items)
+        elif 'items' in stored_data and result is not None:
+            stored_data['items'] = self._versioned_items(stored_data['items'], result.pop('items', []))
         
         # Update local data
-        self.data.update(update_data)
+        self.data.update(stored_data)
+        if items is not None:
+            self.data['items'] = items
+        if result is not None:
+            self.data['version'] = (result.get('version') or 0) + 1
+            StatsRollup.record_change(result, dict(result, **{
+                field: value for field, value in stored_data.items() if field in STATS_FIELDS
+            }))
     
-    def add_item(self, name: str, quantity: int = 1, category: str = "", notes: str = "") -> Dict[str, Any]:
-        """Add an item to the shopping list"""
-        item = {
-            'id': str(ObjectId()),  # Generate unique ID for the item
+    def _version_conflict(self, update_data: Dict[str, Any], expected_version: int) -> VersionConflictError:
+        """Build a conflict error listing only the fields written after expected_version"""
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        current = shopping_lists_collection.find_one({'_id': self.data['_id']}) or {}
+        self._attach_items([ShoppingList(current)])
+        field_versions = current.get('field_versions', {})
+        
+        conflicts = {}
+        for field, value in update_data.items():
+            if field == 'updatedAt' or field_versions.get(field, 0) <= expected_version:
+                continue
+            if field == 'items':
+                # Items whose server version differs from the submitted copy, server
+                # items the submission lacks, and submitted items since removed
+                submitted = {item.get('id'): item for item in value if isinstance(item, dict)}
+                current_ids = {item.get('id') for item in current.get('items', [])}
+                conflicting_items = [
+                    item for item in current.get('items', [])
+                    if item.get('id') not in submitted
+                    or submitted[item.get('id')].get('version') != item.get('version')
+                ]
+                conflicting_items.extend(
+                    {'id': item_id, 'removed': True} for item_id, item in submitted.items()
+                    if item_id not in current_ids and item.get('version') is not None
+                )
+                if conflicting_items:
+                    conflicts['items'] = conflicting_items
+            else:
+                conflicts[field] = current.get(field)
+        
+        return VersionConflictError(current.get('version', 0) if current else None, conflicts)
+    
+    @staticmethod
+    def _versioned_items(items: List[Dict[str, Any]], stored_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Give written items their stored version, bumped for items whose content changed"""
+        stored_by_id = {item.get('id'): item for item in stored_items}
+        result = []
+        for item in items:
+            stored = stored_by_id.get(item.get('id'))
+            version = (stored or {}).get('version') or 0
+            if stored is None or any(item.get(field) != stored.get(field) for field in ITEM_FIELDS):
+                version += 1
+            result.append(dict(item, version=version))
+        return result
+    
+    @staticmethod
+    def _versioned_items_expression(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Aggregation expression applying _versioned_items against the stored $items"""
+        stored = {'$arrayElemAt': [{'$filter': {
+            'input': {'$ifNull': ['$items', []]},
+            'as': 'stored',
+            'cond': {'$eq': ['$$stored.id', '$$item.id']}
+        }}, 0]}
+        changed = {'$or': [{'$ne': [f'$$item.{field}', f'$$stored.{field}']} for field in ITEM_FIELDS]}
+        return {'$map': {
+            'input': {'$literal': items},
+            'as': 'item',
+            'in': {'$let': {
+                'vars': {'stored': stored},
+                'in': {'$mergeObjects': ['$$item', {'version': {'$add': [
+                    {'$ifNull': ['$$stored.version', 0]},
+                    {'$cond': [changed, 1, 0]}
+                ]}}]}
+            }}
+        }}
+    
+    @staticmethod
+    def _new_item(name: str, quantity: int = 1, category: str = "", notes: str = "", item_id: str = None) -> Dict[str, Any]:
+        """Build a new item document"""
+        return {
+            'id': item_id or str(ObjectId()),  # Generate unique ID for the item
             'name': name,
             'quantity': quantity,
             'category': category,
             'notes': notes,
             'completed': False,
+            'version': 1,
             'createdAt': get_unix_timestamp(),
             'updatedAt': get_unix_timestamp()
         }
+    
+    def add_item(self, name: str, quantity: int = 1, category: str = "", notes: str = "") -> Dict[str, Any]:
+        """Add an item to the shopping list"""
+        item = self._new_item(name, quantity, category, notes)
+        stats_before = self._stats_state()
         
         # Add item to the list
         self.data['items'].append(item)
         
+        set_fields = {}
+        if self.uses_item_collection():
+            # Positions are timestamps for appended items, so they sort after reordered ones
+            ShoppingItems.insert_many(self.data['_id'], [item], get_unix_timestamp())
+        else:
+            set_fields['items'] = self._item_op_expression({'op': 'add', 'item': item})
+        
         # Update in database
-        shopping_lists_collection = db.get_collection('shopping_lists')
-        shopping_lists_collection.update_one(
-            {'_id': self.data['_id']},
-            {
-                '$push': {'items': item},
-                '$set': {'updatedAt': get_unix_timestamp()}
-            }
-        )
+        self._write_list_items({'_id': self.data['_id']}, set_fields, {'item_count': 1})
+        self.data['item_count'] = self.data.get('item_count', 0) + 1
+        StatsRollup.record_change(stats_before, self._stats_state())
         
         return item
     
@@ -167,24 +682,46 @@ class ShoppingList:
         if item_index is None:
             return False
         
+        stats_before = self._stats_state()
+        
         # Update item data
         update_data['updatedAt'] = get_unix_timestamp()
-        self.data['items'][item_index].update(update_data)
+        item = self.data['items'][item_index]
+        item.update(update_data)
+        item['version'] = item.get('version', 0) + 1
         
         # Update in database
-        shopping_lists_collection = db.get_collection('shopping_lists')
-        update_fields = {f'items.$.{key}': value for key, value in update_data.items()}
-        update_fields['updatedAt'] = get_unix_timestamp()
-        
-        shopping_lists_collection.update_one(
-            {'_id': self.data['_id'], 'items.id': item_id},
-            {'$set': update_fields}
-        )
+        if self.uses_item_collection():
+            previous = ShoppingItems.update_one(self.data['_id'], item_id, update_data) or {}
+            completed_delta = 0
+            if 'completed' in update_data:
+                completed_delta = bool(update_data['completed']) - bool(previous.get('completed', False))
+            self._write_list_items({'_id': self.data['_id']}, {}, {'completed_count': completed_delta})
+        else:
+            items = self._item_op_expression({'op': 'update', 'id': item_id, 'fields': update_data})
+            
+            completed_delta = 0
+            if 'completed' in update_data:
+                # Only count the change when the stored item actually flips
+                completed = bool(update_data['completed'])
+                if self._write_list_items(
+                    {'_id': self.data['_id'], 'items': {'$elemMatch': self._completed_match(item_id, not completed)}},
+                    {'items': items},
+                    {'completed_count': 1 if completed else -1}
+                ):
+                    completed_delta = 1 if completed else -1
+            
+            if not completed_delta:
+                self._write_list_items({'_id': self.data['_id'], 'items.id': item_id}, {'items': items}, {})
+        self.data['completed_count'] = self.data.get('completed_count', 0) + completed_delta
+        StatsRollup.record_change(stats_before, self._stats_state())
         
         return True
     
     def remove_item(self, item_id: str) -> bool:
         """Remove an item from the shopping list"""
+        stats_before = self._stats_state()
+        
         # Find and remove item
         original_length = len(self.data['items'])
         self.data['items'] = [item for item in self.data['items'] if item['id'] != item_id]
@@ -193,17 +730,475 @@ class ShoppingList:
             return False  # Item not found
         
         # Update in database
+        if self.uses_item_collection():
+            removed = ShoppingItems.delete_one(self.data['_id'], item_id)
+            item_delta = -1 if removed else 0
+            completed_delta = -1 if removed and removed.get('completed', False) else 0
+            self._write_list_items(
+                {'_id': self.data['_id']}, {},
+                {'item_count': item_delta, 'completed_count': completed_delta}
+            )
+        else:
+            # Match the stored completed state so the counters change by exactly the removed item
+            items = self._item_op_expression({'op': 'remove', 'id': item_id})
+            item_delta = completed_delta = 0
+            for completed in (True, False):
+                if self._write_list_items(
+                    {'_id': self.data['_id'], 'items': {'$elemMatch': self._completed_match(item_id, completed)}},
+                    {'items': items},
+                    {'item_count': -1, 'completed_count': -1 if completed else 0}
+                ):
+                    item_delta, completed_delta = -1, -1 if completed else 0
+                    break
+        self.data['item_count'] = self.data.get('item_count', 0) + item_delta
+        self.data['completed_count'] = self.data.get('completed_count', 0) + completed_delta
+        StatsRollup.record_change(stats_before, self._stats_state())
+        
+        return True
+    
+    def _write_list_items(self, query: Dict[str, Any], set_fields: Dict[str, Any], counter_deltas: Dict[str, int]) -> bool:
+        """Record an item write on the list document in one pipeline update
+        
+        Sets set_fields, adds counter_deltas to the counters, bumps the version
+        and records the bumped version as the items' field version. Returns
+        False when query matched nothing.
+        """
+        stage = dict(set_fields, updatedAt=get_unix_timestamp(), version={'$add': [{'$ifNull': ['$version', 0]}, 1]})
+        for field, delta in counter_deltas.items():
+            stage[field] = {'$add': [{'$ifNull': [f'${field}', 0]}, delta]}
+        
         shopping_lists_collection = db.get_collection('shopping_lists')
-        shopping_lists_collection.update_one(
-            {'_id': self.data['_id']},
-            {
-                '$pull': {'items': {'id': item_id}},
-                '$set': {'updatedAt': get_unix_timestamp()}
-            }
+        result = shopping_lists_collection.find_one_and_update(
+            query,
+            [{'$set': stage}, {'$set': {'field_versions.items': '$version'}}],
+            projection={'_id': 0, 'version': 1},
+            return_document=ReturnDocument.AFTER
         )
+        self._invalidate_cached()
+        if result is None:
+            return False
+        self.data['version'] = result['version']
+        return True
+    
+    @staticmethod
+    def _completed_match(item_id: str, completed: bool) -> Dict[str, Any]:
+        """$elemMatch condition for an embedded item in the given completed state"""
+        return {'id': item_id, 'completed': True if completed else {'$ne': True}}
+    
+    def apply_item_ops(self, ops: List[Dict[str, Any]], expected_version: Optional[int] = None) -> None:
+        """Apply an ordered batch of item operations in a single update.
         
+        Supported ops (same semantics as add_item/update_item/remove_item):
+          {'op': 'add', 'item': {'name', 'quantity', 'category', 'notes', 'id'?}}
+          {'op': 'update', 'id': item_id, 'fields': {...}, 'version'?: n}
+          {'op': 'remove', 'id': item_id, 'version'?: n}
+          {'op': 'reorder', 'order': [item_id, ...]}
+        
+        Ops are translated into an update pipeline applied by MongoDB against
+        the stored items, so concurrent edits to other items are preserved.
+        An op carrying an item 'version' (or an expected list version) only
+        applies if the stored version still matches, checked in the same
+        update; otherwise VersionConflictError lists the conflicting items.
+        Ops that only lost to a list version bump are applied again, at most
+        MAX_WRITE_ATTEMPTS times in all. Collection-mode lists get the same semantics from one ordered bulk
+        write on shopping_items. Raises ValueError for malformed ops.
+        """
+        if not isinstance(ops, list) or not ops:
+            raise ValueError("ops must be a non-empty list")
+        if len(ops) > MAX_ITEM_OPS:
+            raise ValueError(f"Too many ops (max {MAX_ITEM_OPS})")
+        
+        now = get_unix_timestamp()
+        parsed_ops = [self._parse_item_op(op, now) for op in ops]
+        versioned_ops = [
+            op for op in parsed_ops
+            if op['op'] in ('update', 'remove') and op.get('version') is not None
+        ]
+        
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            if self.uses_item_collection():
+                written = self._apply_item_ops_to_collection(parsed_ops, versioned_ops, now, expected_version)
+            else:
+                written = self._apply_item_ops_to_embedded(parsed_ops, versioned_ops, now, expected_version)
+            if written:
+                return
+            
+            conflict = self._item_version_conflict(versioned_ops)
+            if conflict.conflicts or conflict.current_version is None:
+                raise conflict
+            # Only the list version moved on, none of the targeted items did
+            expected_version = conflict.current_version
+        raise conflict
+    
+    def _apply_item_ops_to_embedded(self, parsed_ops: List[Dict[str, Any]], versioned_ops: List[Dict[str, Any]],
+                                    now: int, expected_version: Optional[int] = None) -> bool:
+        """Apply parsed item ops to an embedded list in one pipeline update
+        
+        Returns False when the update matched nothing: the list or one of the
+        targeted item versions moved on, or the list is gone.
+        """
+        new_ids = self._new_item_ids(parsed_ops, (item.get('id') for item in self.data.get('items', [])))
+        
+        pipeline = [{'$set': {'items': self._item_op_expression(op)}} for op in parsed_ops]
+        pipeline.append({'$set': {
+            'updatedAt': now,
+            'version': {'$add': [{'$ifNull': ['$version', 0]}, 1]},
+            'item_count': {'$size': '$items'},
+            'completed_count': {'$size': {'$filter': {
+                'input': '$items',
+                'as': 'item',
+                'cond': {'$eq': ['$$item.completed', True]}
+            }}}
+        }})
+        pipeline.append({'$set': {'field_versions.items': '$version'}})
+        
+        query = {'_id': self.data['_id']}
+        if expected_version is not None:
+            query['version'] = _version_filter(expected_version)
+        
+        if versioned_ops:
+            query['$and'] = [
+                {'items': {'$elemMatch': {'id': op['id'], 'version': _version_filter(op['version'])}}}
+                for op in versioned_ops
+            ]
+        
+        # Added ids must still be free when the update applies, not just in our copy
+        if new_ids:
+            query['items.id'] = {'$nin': new_ids}
+        
+        # The stored state before the update gives exact stats deltas; the
+        # state after it follows from replaying the ops on it
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        before = shopping_lists_collection.find_one_and_update(
+            query,
+            pipeline,
+            return_document=ReturnDocument.BEFORE
+        )
+        self._invalidate_cached()
+        
+        if before:
+            self.data = self._replay_item_ops(before, parsed_ops, now)
+            StatsRollup.record_change(ShoppingList(before)._stats_state(), self._stats_state())
+            return True
+        
+        if new_ids:
+            current = shopping_lists_collection.find_one({'_id': self.data['_id']}, {'items.id': 1}) or {}
+            self._new_item_ids(parsed_ops, (item.get('id') for item in current.get('items', [])))
+        return False
+    
+    def _apply_item_ops_to_collection(self, parsed_ops: List[Dict[str, Any]], versioned_ops: List[Dict[str, Any]],
+                                      now: int, expected_version: Optional[int] = None) -> bool:
+        """Apply parsed item ops to a collection-mode list
+        
+        Item versions are checked against the stored items first, and again in
+        the filter of every versioned item write, since an item can change in
+        between. The list version and counts are bumped (only if the list
+        still has expected_version, when given) before all item writes are
+        sent as one ordered bulk write. There is no transaction, so when a
+        write misses, the writes of the other ops still apply; the counts are
+        then recounted and VersionConflictError lists the items that moved on.
+        
+        Returns False when the list version check failed and nothing was written.
+        """
+        list_id = self.data['_id']
+        state = {item['id']: item for item in ShoppingItems.find_state(list_id)}
+        order = list(state)
+        
+        if any(
+            op['id'] not in state or (state[op['id']].get('version') or 0) != (op['version'] or 0)
+            for op in versioned_ops
+        ):
+            raise self._item_version_conflict(versioned_ops)
+        
+        self._new_item_ids(parsed_ops, state)
+        
+        writes = []
+        updates = deletes = 0
+        item_delta = completed_delta = 0
+        reordered = False
+        for op in parsed_ops:
+            kind = op['op']
+            if kind == 'add':
+                item = op['item']
+                writes.append(InsertOne(dict(item, list_id=list_id, position=now)))
+                state[item['id']] = item
+                order.append(item['id'])
+                item_delta += 1
+            elif kind == 'update' and op['id'] in state:
+                writes.append(UpdateOne(
+                    self._item_write_filter(list_id, op, state),
+                    {'$set': op['fields'], '$inc': {'version': 1}}
+                ))
+                updates += 1
+                if 'completed' in op['fields']:
+                    completed_delta += bool(op['fields']['completed']) - bool(state[op['id']].get('completed'))
+                previous = state[op['id']]
+                state[op['id']] = dict(previous, **op['fields'], version=(previous.get('version') or 0) + 1)
+            elif kind == 'remove' and op['id'] in state:
+                writes.append(DeleteOne(self._item_write_filter(list_id, op, state)))
+                deletes += 1
+                item_delta -= 1
+                completed_delta -= bool(state.pop(op['id']).get('completed'))
+                order.remove(op['id'])
+            elif kind == 'reorder':
+                listed = [item_id for item_id in op['order'] if item_id in state]
+                order = listed + [item_id for item_id in order if item_id not in set(listed)]
+                reordered = True
+        
+        if reordered:
+            writes.extend(
+                UpdateOne({'list_id': list_id, 'id': item_id}, {'$set': {'position': position}})
+                for position, item_id in enumerate(order)
+            )
+            updates += len(order)
+        
+        list_query = {'_id': list_id}
+        if expected_version is not None:
+            list_query['version'] = _version_filter(expected_version)
+        
+        # The stored state before the update gives exact stats deltas
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        before = shopping_lists_collection.find_one_and_update(
+            list_query,
+            [
+                {'$set': {
+                    'updatedAt': now,
+                    'version': {'$add': [{'$ifNull': ['$version', 0]}, 1]},
+                    'item_count': {'$add': [{'$ifNull': ['$item_count', 0]}, item_delta]},
+                    'completed_count': {'$add': [{'$ifNull': ['$completed_count', 0]}, completed_delta]}
+                }},
+                {'$set': {'field_versions.items': '$version'}}
+            ],
+            return_document=ReturnDocument.BEFORE
+        )
+        self._invalidate_cached()
+        
+        if before is None:
+            return False
+        
+        version = (before.get('version') or 0) + 1
+        list_data = dict(
+            before,
+            updatedAt=now,
+            version=version,
+            item_count=(before.get('item_count') or 0) + item_delta,
+            completed_count=(before.get('completed_count') or 0) + completed_delta,
+            field_versions=dict(before.get('field_versions') or {}, items=version)
+        )
+        
+        duplicate_id = None
+        try:
+            result = ShoppingItems.bulk_write(writes)
+            complete = result is None or (result.matched_count == updates and result.deleted_count == deletes)
+        except BulkWriteError as e:
+            # An id added concurrently by another writer; the ordered write stopped there
+            complete = False
+            duplicate_id = next((error['op'].get('id') for error in e.details.get('writeErrors', [])
+                                 if error.get('code') == 11000), None)
+            if duplicate_id is None:
+                raise
+        
+        if not complete:
+            # Some writes missed: the counters were bumped for writes that did not happen
+            item_count, completed_count = ShoppingItems.count(list_id)
+            list_data = shopping_lists_collection.find_one_and_update(
+                {'_id': list_id},
+                {'$set': {'item_count': item_count, 'completed_count': completed_count}},
+                return_document=ReturnDocument.AFTER
+            ) or list_data
+        
+        self.data = list_data
+        self._attach_items([self])
+        StatsRollup.record_change(ShoppingList(before)._stats_state(), self._stats_state())
+        
+        if duplicate_id is not None:
+            raise ValueError(f"Item {duplicate_id} already exists")
+        if not complete:
+            # The versions these items would have after this batch's own writes
+            expected_versions = {op['id']: state.get(op['id'], {}).get('version') for op in versioned_ops}
+            conflict = self._item_version_conflict(versioned_ops, expected_versions)
+            if conflict.conflicts:
+                raise conflict
         return True
     
+    @staticmethod
+    def _item_write_filter(list_id: Any, op: Dict[str, Any], state: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Filter for one item write, matching the item's version as of this batch for versioned ops"""
+        item_filter = {'list_id': list_id, 'id': op['id']}
+        if op.get('version') is not None:
+            item_filter['version'] = _version_filter(state[op['id']].get('version') or 0)
+        return item_filter
+    
+    def _item_version_conflict(self, versioned_ops: List[Dict[str, Any]],
+                               expected_versions: Optional[Dict[str, Optional[int]]] = None) -> VersionConflictError:
+        """Build a conflict error listing the server copy of each item whose version moved on
+        
+        Items are compared with the versions the ops were based on, or with
+        expected_versions (None for an item expected to be removed) when given.
+        """
+        if expected_versions is None:
+            expected_versions = {op['id']: op['version'] for op in versioned_ops}
+        
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        current = shopping_lists_collection.find_one({'_id': self.data['_id']}) or {}
+        self._attach_items([ShoppingList(current)])
+        current_items = {item.get('id'): item for item in current.get('items', [])}
+        
+        conflicting_items = []
+        for item_id, version in expected_versions.items():
+            item = current_items.get(item_id)
+            if item is None:
+                if version is not None:
+                    conflicting_items.append({'id': item_id, 'removed': True})
+            elif version is None or (item.get('version') or 0) != (version or 0):
+                conflicting_items.append(item)
+        
+        conflicts = {'items': conflicting_items} if conflicting_items else {}
+        return VersionConflictError(current.get('version', 0) if current else None, conflicts)
+    
+    @staticmethod
+    def _new_item_ids(parsed_ops: List[Dict[str, Any]], existing_ids: Iterable[str]) -> List[str]:
+        """Check that every add op uses an id not present when it applies
+        
+        Raises ValueError for a duplicate id. Returns the added ids that were
+        not removed earlier in the batch, which must be absent from the stored list.
+        """
+        present = set(existing_ids)
+        removed, new_ids = set(), []
+        for op in parsed_ops:
+            if op['op'] == 'add':
+                item_id = op['item']['id']
+                if item_id in present:
+                    raise ValueError(f"Item {item_id} already exists")
+                present.add(item_id)
+                if item_id not in removed:
+                    new_ids.append(item_id)
+            elif op['op'] == 'remove':
+                present.discard(op['id'])
+                removed.add(op['id'])
+        return new_ids
+    
+    @classmethod
+    def _parse_item_op(cls, op: Dict[str, Any], now: int) -> Dict[str, Any]:
+        """Validate one item op and normalize it into its kind and payload"""
+        if not isinstance(op, dict):
+            raise ValueError("Each op must be an object")
+        
+        kind = op.get('op')
+        
+        if kind == 'add':
+            data = op.get('item') or {}
+            name = str(data.get('name', '')).strip()
+            if not name:
+                raise ValueError("add op requires an item name")
+            item = cls._new_item(
+                name,
+                data.get('quantity', 1),
+                data.get('category', ''),
+                data.get('notes', ''),
+                data.get('id')
+            )
+            return {'op': kind, 'item': item}
+        
+        if kind == 'update':
+            fields = {key: value for key, value in (op.get('fields') or {}).items() if key in ITEM_FIELDS}
+            if not op.get('id') or not fields:
+                raise ValueError(f"update op requires an id and at least one of {list(ITEM_FIELDS)}")
+            fields['updatedAt'] = now
+            return {'op': kind, 'id': op['id'], 'fields': fields, 'version': op.get('version')}
+        
+        if kind == 'remove':
+            if not op.get('id'):
+                raise ValueError("remove op requires an id")
+            return {'op': kind, 'id': op['id'], 'version': op.get('version')}
+        
+        if kind == 'reorder':
+            order = op.get('order')
+            if not isinstance(order, list) or not order:
+                raise ValueError("reorder op requires a non-empty order list")
+            if not all(isinstance(item_id, str) and item_id for item_id in order):
+                raise ValueError("reorder op order must list item ids")
+            # A repeated id would otherwise copy the item in embedded lists
+            return {'op': kind, 'order': list(dict.fromkeys(order))}
+        
+        raise ValueError(f"Unknown op: {kind}")
+    
+    @staticmethod
+    def _replay_item_ops(list_data: Dict[str, Any], parsed_ops: List[Dict[str, Any]], now: int) -> Dict[str, Any]:
+        """Get an embedded list as the apply_item_ops pipeline leaves it, from its state before the update"""
+        items = list(list_data.get('items') or [])
+        for op in parsed_ops:
+            kind = op['op']
+            if kind == 'add':
+                items.append(op['item'])
+            elif kind == 'update':
+                items = [
+                    dict(item, **op['fields'], version=(item.get('version') or 0) + 1) if item.get('id') == op['id'] else item
+                    for item in items
+                ]
+            elif kind == 'remove':
+                items = [item for item in items if item.get('id') != op['id']]
+            else:
+                listed = [item for item_id in op['order'] for item in items if item.get('id') == item_id]
+                items = listed + [item for item in items if item.get('id') not in op['order']]
+        
+        version = (list_data.get('version') or 0) + 1
+        item_count, completed_count = _count_items(items)
+        return dict(
+            list_data,
+            items=items,
+            updatedAt=now,
+            version=version,
+            item_count=item_count,
+            completed_count=completed_count,
+            field_versions=dict(list_data.get('field_versions') or {}, items=version)
+        )
+    
+    @staticmethod
+    def _item_op_expression(op: Dict[str, Any]) -> Dict[str, Any]:
+        """Translate one parsed item op into an aggregation expression over $items"""
+        items = {'$ifNull': ['$items', []]}
+        kind = op['op']
+        
+        if kind == 'add':
+            # $literal keeps user strings starting with '$' from being read as field paths
+            return {'$concatArrays': [items, [{'$literal': op['item']}]]}
+        
+        if kind == 'update':
+            return {'$map': {
+                'input': items,
+                'as': 'item',
+                'in': {'$cond': [
+                    {'$eq': ['$$item.id', {'$literal': op['id']}]},
+                    {'$mergeObjects': [
+                        '$$item',
+                        {'$literal': op['fields']},
+                        {'version': {'$add': [{'$ifNull': ['$$item.version', 0]}, 1]}}
+                    ]},
+                    '$$item'
+                ]}
+            }}
+        
+        if kind == 'remove':
+            return {'$filter': {
+                'input': items,
+                'as': 'item',
+                'cond': {'$ne': ['$$item.id', {'$literal': op['id']}]}
+            }}
+        
+        # reorder: listed items first in the given order, then any items the client did not list
+        order = op['order']
+        ordered = [
+            {'$filter': {'input': items, 'as': 'item', 'cond': {'$eq': ['$$item.id', {'$literal': item_id}]}}}
+            for item_id in order
+        ]
+        rest = {'$filter': {
+            'input': items,
+            'as': 'item',
+            'cond': {'$not': [{'$in': ['$$item.id', {'$literal': order}]}]}
+        }}
+        return {'$concatArrays': ordered + [rest]}
+    
     def archive(self) -> None:
         """Archive the shopping list (deprecated - use set_status)"""
         self.update({'archived': True, 'status': 'archived'})
@@ -234,7 +1229,142 @@ class ShoppingList:
     def hard_delete(self) -> None:
         """Permanently delete the shopping list from database"""
         shopping_lists_collection = db.get_collection('shopping_lists')
-        shopping_lists_collection.delete_one({'_id': self.data['_id']})
+        deleted = shopping_lists_collection.find_one_and_delete(
+            {'_id': self.data['_id']},
+            projection=dict.fromkeys(STATS_FIELDS, 1)
+        )
+        StatsRollup.record_change(deleted, None)
+        if self.uses_item_collection():
+            ShoppingItems.delete_for_list(self.data['_id'])
+        self._invalidate_cached()
+    
+    def move_items_to_collection(self) -> bool:
+        """Move embedded items into shopping_items
+        
+        Returns False (and leaves the list untouched) when the list was
+        written concurrently; run again to retry.
+        """
+        if self.uses_item_collection():
+            return True
+        
+        list_id = self.data['_id']
+        items = ShoppingItems.with_ids(self.data.get('items', []))
+        item_count, completed_count = _count_items(items)
+        ShoppingItems.replace(list_id, items)
+        
+        # Version and updatedAt stay unchanged: the list content is the same
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        result = shopping_lists_collection.update_one(
+            {
+                '_id': list_id,
+                'version': _version_filter(self.data.get('version', 0)),
+                'item_storage': {'$ne': ITEM_STORAGE_COLLECTION}
+            },
+            {
+                '$set': {
+                    'item_storage': ITEM_STORAGE_COLLECTION,
+                    'item_count': item_count,
+                    'completed_count': completed_count
+                },
+                '$unset': {'items': ''}
+            }
+        )
+        self._invalidate_cached()
+        
+        if not result.modified_count:
+            # Drop the copied items unless another run finished the move meanwhile
+            if not shopping_lists_collection.find_one({'_id': list_id, 'item_storage': ITEM_STORAGE_COLLECTION}, {'_id': 1}):
+                ShoppingItems.delete_for_list(list_id)
+            return False
+        
+        self.data.update({'item_storage': ITEM_STORAGE_COLLECTION, 'item_count': item_count, 'completed_count': completed_count})
+        self.data['items'] = items
+        return True
+    
+    def move_items_to_embedded(self) -> bool:
+        """Move items from shopping_items back into the list document
+        
+        Returns False (and leaves the list untouched) when the list was
+        written concurrently; run again to retry.
+        """
+        if not self.uses_item_collection():
+            return True
+        
+        list_id = self.data['_id']
+        items = ShoppingItems.find_by_list_ids([list_id])[list_id]
+        
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        result = shopping_lists_collection.update_one(
+            {
+                '_id': list_id,
+                'version': _version_filter(self.data.get('version', 0)),
+                'item_storage': ITEM_STORAGE_COLLECTION
+            },
+            {
+                '$set': {'items': items},
+                '$unset': {'item_storage': ''}
+            }
+        )
+        self._invalidate_cached()
+        
+        if not result.modified_count:
+            return False
+        
+        ShoppingItems.delete_for_list(list_id)
+        self.data.pop('item_storage', None)
+        self.data['items'] = items
+        return True
+    
+    @classmethod
+    def backfill_item_counts(cls) -> int:
+        """Compute item_count/completed_count for embedded lists written before the counters existed"""
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        result = shopping_lists_collection.update_many(
+            {'item_count': {'$exists': False}, 'item_storage': {'$ne': ITEM_STORAGE_COLLECTION}},
+            [{'$set': {
+                'item_count': {'$size': {'$ifNull': ['$items', []]}},
+                'completed_count': {'$size': {'$filter': {
+                    'input': {'$ifNull': ['$items', []]},
+                    'as': 'item',
+                    'cond': {'$eq': ['$$item.completed', True]}
+                }}}
+            }}]
+        )
+        return result.modified_count
+    
+    @classmethod
+    def migrate_item_storage(cls, target: str = ITEM_STORAGE_COLLECTION, dry_run: bool = False) -> Dict[str, int]:
+        """Move every list not yet in the target storage mode
+        
+        Returns counts of migrated lists and lists skipped because they were
+        written during the move, or only the pending count for a dry run.
+        """
+        if target not in ITEM_STORAGE_MODES:
+            raise ValueError(f"Invalid item storage: {target}. Must be one of {list(ITEM_STORAGE_MODES)}")
+        
+        if target == ITEM_STORAGE_COLLECTION:
+            query = {'item_storage': {'$ne': ITEM_STORAGE_COLLECTION}}
+        else:
+            query = {'item_storage': ITEM_STORAGE_COLLECTION}
+        
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        if dry_run:
+            return {'pending': shopping_lists_collection.count_documents(query)}
+        
+        migrated = skipped = 0
+        for list_data in shopping_lists_collection.find(query):
+            shopping_list = cls(list_data)
+            if target == ITEM_STORAGE_COLLECTION:
+                moved = shopping_list.move_items_to_collection()
+            else:
+                moved = shopping_list.move_items_to_embedded()
+            
+            if moved:
+                migrated += 1
+            else:
+                skipped += 1
+        
+        return {'migrated': migrated, 'skipped': skipped}
     
     def is_owned_by(self, user_id: str) -> bool:
         """Check if the list is owned by the specified user"""
@@ -244,91 +1374,353 @@ class ShoppingList:
         """Check if the list belongs to a home"""
         return self.data.get('home_id') is not None
     
-    def can_user_edit(self, user_id: str) -> bool:
+    def _is_home_member(self, user_id: str, homes: Optional[Dict[str, Any]] = None) -> bool:
+        """Check home membership, using preloaded homes (keyed by string ID) when given"""
+        home_id = str(self.data['home_id'])
+        if homes is None:
+            from home_models import Home
+            return Home.is_member_of(home_id, user_id)
+        
+        home = homes.get(home_id)
+        return bool(home and home.is_member(user_id))
+    
+    def can_user_edit(self, user_id: str, homes: Optional[Dict[str, Any]] = None) -> bool:
         """Check if user can edit this list (owners can edit metadata, home members can edit items)"""
         if self.is_owned_by(user_id):
             return True
         
         # For home lists, members can edit items but not list metadata
         if self.is_in_home():
-            from home_models import Home
-            home = Home.find_by_id(str(self.data['home_id']))
-            return home and home.is_member(user_id)
+            return self._is_home_member(user_id, homes)
         
         return False
     
-    def can_user_complete_items(self, user_id: str) -> bool:
+    def can_user_complete_items(self, user_id: str, homes: Optional[Dict[str, Any]] = None) -> bool:
         """Check if user can mark items as completed (owners and home members)"""
         if self.is_owned_by(user_id):
             return True
         
         if self.is_in_home():
-            from home_models import Home
-            home = Home.find_by_id(str(self.data['home_id']))
-            return home and home.is_member(user_id)
+            return self._is_home_member(user_id, homes)
         
         return False
     
+    def _item_counts(self) -> Tuple[int, int]:
+        """Get (item_count, completed_count), counting items only for lists not yet backfilled"""
+        if 'item_count' in self.data:
+            return self.data['item_count'], self.data.get('completed_count', 0)
+        return _count_items(self.data.get('items', []))
+    
+    def _stats_state(self) -> Dict[str, Any]:
+        """Snapshot of the fields that feed the stats rollups"""
+        state = {field: self.data.get(field) for field in STATS_FIELDS}
+        state['item_count'], state['completed_count'] = self._item_counts()
+        return state
+    
     def can_be_completed(self) -> bool:
         """Check if the list can be marked as completed (all items are checked)"""
-        items = self.data.get('items', [])
-        if not items:
+        item_count, completed_count = self._item_counts()
+        if not item_count:
             return False  # Empty lists can't be completed
         
-        return all(item.get('completed', False) for item in items)
+        return completed_count == item_count
     
     def get_completion_percentage(self) -> float:
         """Get the completion percentage of the list"""
-        items = self.data.get('items', [])
-        if not items:
+        item_count, completed_count = self._item_counts()
+        if not item_count:
             return 0.0
         
-        completed_items = sum(1 for item in items if item.get('completed', False))
-        return (completed_items / len(items)) * 100
+        return (completed_count / item_count) * 100
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization"""
-        result = self.data.copy()
-        result['_id'] = str(result['_id'])
-        result['user_id'] = str(result['user_id'])
+    def to_dict(self, fields: Optional[frozenset] = None, stringify_ids: bool = True) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization, optionally only the selected fields
+        
+        Built in one pass over the document, computing only selected fields.
+        With stringify_ids=False ObjectIds are left for the app's JSON provider.
+        """
+        def selected(field):
+            return fields is None or field in fields
         
-        # Convert home_id to string if present
-        if result.get('home_id'):
-            result['home_id'] = str(result['home_id'])
+        data = self.data
+        result = {
+            key: value for key, value in data.items()
+            if key not in HIDDEN_LIST_FIELDS and (key == '_id' or selected(key))
+        }
+        
+        if stringify_ids:
+            result['_id'] = str(result['_id'])
+            if 'user_id' in result:
+                result['user_id'] = str(result['user_id'])
+            
+            # Convert home_id to string if present
+            if result.get('home_id'):
+                result['home_id'] = str(result['home_id'])
         
         # Add computed fields
-        result['can_be_completed'] = self.can_be_completed()
-        result['completion_percentage'] = self.get_completion_percentage()
+        if selected('can_be_completed'):
+            result['can_be_completed'] = self.can_be_completed()
+        if selected('completion_percentage'):
+            result['completion_percentage'] = self.get_completion_percentage()
+        
+        # Lists written before versioning count as version 0
+        if selected('version'):
+            result.setdefault('version', 0)
         
         # Ensure status field exists (for backward compatibility)
-        if 'status' not in result:
-            result['status'] = 'archived' if result.get('archived', False) else 'active'
+        if selected('status') and 'status' not in result:
+            result['status'] = 'archived' if data.get('archived', False) else 'active'
         
         return result
 
+def _stats_group_fields() -> Dict[str, Any]:
+    """$group accumulators for the list and item counters of a set of lists"""
+    # Lists that predate the counters fall back to counting their embedded items
+    item_count = {'$ifNull': ['$item_count', {'$size': {'$ifNull': ['$items', []]}}]}
+    completed_count = {'$ifNull': ['$completed_count', {'$size': {'$filter': {
+        'input': {'$ifNull': ['$items', []]},
+        'as': 'item',
+        'cond': {'$eq': ['$$item.completed', True]}
+    }}}]}
+    return {
+        'lists': {'$sum': 1},
+        'active_lists': {'$sum': {'$cond': [{'$eq': ['$archived', True]}, 0, 1]}},
+        'items': {'$sum': item_count},
+        'completed_items': {'$sum': completed_count}
+    }
+
+class StatsRollup:
+    """Materialized shopping stats in the user_stats collection
+    
+    One document per scope: a user's personal lists (_id is the user ID), a
+    home's lists (_id is the home ID), or the lists a user owns in a home
+    ('owner' scope, _id '<user_id>:<home_id>', with user_id and home_id
+    fields). A user's stats cover their personal lists, the lists of their
+    homes and their own lists in homes they left. ShoppingList writes
+    adjust the counters with $inc; reconcile() rebuilds them from the lists.
+    """
+    
+    COUNTERS = ('lists', 'active_lists', 'items', 'completed_items')
+    
+    @staticmethod
+    def _collection():
+        return db.get_collection('user_stats')
+    
+    @staticmethod
+    def owner_scope_id(user_id: Any, home_id: Any) -> str:
+        """Get the _id of the rollup of a user's own lists in a home"""
+        return f"{user_id}:{home_id}"
+    
+    @classmethod
+    def _contributions(cls, list_data: Optional[Dict[str, Any]]) -> List[Tuple[Any, Dict[str, Any], Dict[str, int]]]:
+        """Get the scopes a list counts in as (scope ID, scope fields, what it adds to the counters)"""
+        if not list_data:
+            return []
+        
+        if list_data.get('home_id'):
+            user_id, home_id = list_data.get('user_id'), list_data['home_id']
+            scopes = [
+                (home_id, {'scope': 'home'}),
+                (cls.owner_scope_id(user_id, home_id), {'scope': 'owner', 'user_id': user_id, 'home_id': home_id})
+            ]
+        else:
+            scopes = [(list_data.get('user_id'), {'scope': 'user'})]
+        
+        # Deleted lists do not count, same as the accessible-lists queries
+        if list_data.get('status') == 'deleted':
+            counters = {}
+        else:
+            counters = {
+                'lists': 1,
+                'active_lists': 0 if list_data.get('archived', False) is True else 1,
+                'items': list_data.get('item_count') or 0,
+                'completed_items': list_data.get('completed_count') or 0
+            }
+        return [(scope_id, fields, counters) for scope_id, fields in scopes]
+    
+    @classmethod
+    def record_change(cls, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        """Apply the difference between a list's previous and new state (None when absent)"""
+        deltas, scope_fields = {}, {}
+        for sign, list_data in ((-1, before), (1, after)):
+            for scope_id, fields, counters in cls._contributions(list_data):
+                scope_fields[scope_id] = fields
+                for name, value in counters.items():
+                    scope_deltas = deltas.setdefault(scope_id, dict.fromkeys(cls.COUNTERS, 0))
+                    scope_deltas[name] += sign * value
+        
+        for scope_id, counters in deltas.items():
+            counters = {name: value for name, value in counters.items() if value}
+            if counters:
+                cls._collection().update_one(
+                    {'_id': scope_id},
+                    {'$inc': counters, '$setOnInsert': scope_fields[scope_id]},
+                    upsert=True
+                )
+    
+    @classmethod
+    def find_for_user(cls, user_id: str) -> List[Dict[str, Any]]:
+        """Get the rollups making up a user's stats: personal, their homes', and their own lists in other homes"""
+        from home_models import Home
+        home_ids = Home.find_ids_by_user_id(user_id)
+        return list(cls._collection().find({'$or': [
+            {'_id': {'$in': [ObjectId(user_id)] + home_ids}},
+            {'user_id': ObjectId(user_id), 'home_id': {'$nin': home_ids}}
+        ]}))
+    
+    @classmethod
+    def is_empty(cls) -> bool:
+        """Check whether the rollups were never built"""
+        return cls._collection().estimated_document_count() == 0
+    
+    @classmethod
+    def reconcile(cls) -> Dict[str, Any]:
+        """Rebuild every rollup from the lists and report the scopes that had drifted
+        
+        Writes racing with a rebuild can leave a scope off by their delta;
+        the next run corrects it.
+        """
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        expected = {}
+        for group in shopping_lists_collection.aggregate([
+            {'$match': {'status': {'$ne': 'deleted'}}},
+            {'$group': dict(
+                _id={'$ifNull': ['$home_id', '$user_id']},
+                home_id={'$max': '$home_id'},
+                **_stats_group_fields()
+            )}
+        ]):
+            expected[group['_id']] = {
+                'scope': 'home' if group['home_id'] else 'user',
+                **{name: group[name] for name in cls.COUNTERS}
+            }
+        for group in shopping_lists_collection.aggregate([
+            {'$match': {'status': {'$ne': 'deleted'}, 'home_id': {'$ne': None}}},
+            {'$group': dict(_id={'user_id': '$user_id', 'home_id': '$home_id'}, **_stats_group_fields())}
+        ]):
+            user_id, home_id = group['_id']['user_id'], group['_id']['home_id']
+            expected[cls.owner_scope_id(user_id, home_id)] = {
+                'scope': 'owner',
+                'user_id': user_id,
+                'home_id': home_id,
+                **{name: group[name] for name in cls.COUNTERS}
+            }
+        
+        scope_count = len(expected)
+        drifted, writes = [], []
+        for stored in cls._collection().find():
+            counters = expected.get(stored['_id'])
+            if counters is None:
+                if any(stored.get(name) for name in cls.COUNTERS):
+                    drifted.append(str(stored['_id']))
+                writes.append(DeleteOne({'_id': stored['_id']}))
+            elif any(stored.get(name, 0) != counters[name] for name in cls.COUNTERS):
+                drifted.append(str(stored['_id']))
+                writes.append(ReplaceOne({'_id': stored['_id']}, counters))
+            expected.pop(stored['_id'], None)
+        
+        # Scopes that have lists but no rollup yet
+        for scope_id, counters in expected.items():
+            drifted.append(str(scope_id))
+            writes.append(ReplaceOne({'_id': scope_id}, counters, upsert=True))
+        
+        if writes:
+            cls._collection().bulk_write(writes, ordered=False)
+        
+        return {'scopes': scope_count, 'drifted': len(drifted), 'drifted_scopes': drifted[:10]}
+
 class ShoppingListStats:
     """Utility class for shopping list statistics"""
     
+    BREAKDOWNS = ('home', 'category')
+    
     @staticmethod
-    def get_user_stats(user_id: str) -> Dict[str, Any]:
-        """Get statistics for user's shopping lists"""
-        shopping_lists = ShoppingList.find_by_user_id(user_id, include_archived=True)
-        
-        total_lists = len(shopping_lists)
-        active_lists = sum(1 for sl in shopping_lists if not sl.data.get('archived', False))
-        archived_lists = total_lists - active_lists
-        
-        total_items = sum(len(sl.data.get('items', [])) for sl in shopping_lists)
-        completed_items = sum(
-            sum(1 for item in sl.data.get('items', []) if item.get('completed', False))
-            for sl in shopping_lists
-        )
+    def _rate(completed: int, total: int) -> float:
+        return (completed / total * 100) if total > 0 else 0
+    
+    @staticmethod
+    def get_user_stats(user_id: str, breakdowns: Iterable[str] = ()) -> Dict[str, Any]:
+        """Get statistics for user's shopping lists
         
-        return {
+        Totals and the per-home breakdown ('home'; personal lists under
+        home_id None) come from the StatsRollup documents of the user and
+        their homes. The per-item-category breakdown ('category') has to read
+        the items and runs an aggregation over the accessible lists.
+        """
+        breakdowns = set(breakdowns)
+        unknown = breakdowns - set(ShoppingListStats.BREAKDOWNS)
+        if unknown:
+            raise ValueError(f"Invalid breakdown: {', '.join(sorted(unknown))}. Must be one of {list(ShoppingListStats.BREAKDOWNS)}")
+        
+        rollups = StatsRollup.find_for_user(user_id)
+        total_lists = sum(rollup.get('lists', 0) for rollup in rollups)
+        active_lists = sum(rollup.get('active_lists', 0) for rollup in rollups)
+        total_items = sum(rollup.get('items', 0) for rollup in rollups)
+        completed_items = sum(rollup.get('completed_items', 0) for rollup in rollups)
+        
+        stats = {
             'total_lists': total_lists,
             'active_lists': active_lists,
-            'archived_lists': archived_lists,
+            'archived_lists': total_lists - active_lists,
             'total_items': total_items,
             'completed_items': completed_items,
-            'completion_rate': (completed_items / total_items * 100) if total_items > 0 else 0
+            'completion_rate': ShoppingListStats._rate(completed_items, total_items)
         }
+        
+        if 'home' in breakdowns:
+            from home_models import Home
+            homes = Home.find_by_ids(
+                rollup['_id'] if rollup.get('scope') == 'home' else rollup['home_id']
+                for rollup in rollups if rollup.get('scope') in ('home', 'owner')
+            )
+            stats['by_home'] = []
+            for rollup in sorted(rollups, key=lambda rollup: -rollup.get('items', 0)):
+                if not rollup.get('lists'):
+                    continue
+                home_id = str(rollup['_id']) if rollup.get('scope') == 'home' else None
+                if rollup.get('scope') == 'owner':
+                    home_id = str(rollup['home_id'])
+                home = homes.get(home_id) if home_id else None
+                stats['by_home'].append({
+                    'home_id': home_id,
+                    'home_name': home.data['name'] if home else None,
+                    'total_lists': rollup['lists'],
+                    'active_lists': rollup.get('active_lists', 0),
+                    'total_items': rollup.get('items', 0),
+                    'completed_items': rollup.get('completed_items', 0),
+                    'completion_rate': ShoppingListStats._rate(rollup.get('completed_items', 0), rollup.get('items', 0))
+                })
+        
+        if 'category' in breakdowns:
+            stats['by_category'] = ShoppingListStats.get_category_breakdown(user_id)
+        
+        return stats
+    
+    @staticmethod
+    def get_category_breakdown(user_id: str) -> List[Dict[str, Any]]:
+        """Count items per category across the user's accessible lists with one aggregation"""
+        shopping_lists_collection = db.get_collection('shopping_lists')
+        query = ShoppingList._build_access_query(user_id, include_archived=True)
+        groups = shopping_lists_collection.aggregate([
+            {'$match': query},
+            # Items of collection-mode lists live in shopping_items
+            {'$lookup': {'from': 'shopping_items', 'localField': '_id', 'foreignField': 'list_id', 'as': 'stored_items'}},
+            {'$project': {'item': {'$concatArrays': [{'$ifNull': ['$items', []]}, '$stored_items']}}},
+            {'$unwind': '$item'},
+            {'$group': {
+                '_id': {'$ifNull': ['$item.category', '']},
+                'items': {'$sum': 1},
+                'completed_items': {'$sum': {'$cond': [{'$eq': ['$item.completed', True]}, 1, 0]}}
+            }},
+            {'$sort': {'items': -1}}
+        ])
+        
+        return [
+            {
+                'category': group['_id'],
+                'total_items': group['items'],
+                'completed_items': group['completed_items'],
+                'completion_rate': ShoppingListStats._rate(group['completed_items'], group['items'])
+            }
+            for group in groups
+        ]
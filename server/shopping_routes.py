@@ -1,12 +1,111 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from shopping_models import ShoppingList, ShoppingListStats
+from shopping_models import ShoppingList, ShoppingListStats, VersionConflictError, MAX_PAGE_SIZE, get_unix_timestamp
+from home_models import Home
+from models import User, PUBLIC_PROFILE_FIELDS
 from middleware import validate_json, auth_required
+from etag import compute_etag, not_modified, with_etag
 from bson import ObjectId
 from datetime import datetime
 
 shopping_bp = Blueprint('shopping', __name__, url_prefix='/api/shopping')
 
+def enrich_shopping_lists(shopping_lists, user_id, fields=None):
+    """Serialize lists with creator, home and permission info.
+    
+    Creators and homes for the whole result set are resolved with one $in
+    query per collection, and permissions are computed from the loaded home
+    membership, so the cost does not grow with the number of lists. With a
+    field selection, lookups for enrichment that was not selected are skipped.
+    """
+    def selected(field):
+        return fields is None or field in fields
+    
+    home_lists = [sl for sl in shopping_lists if sl.is_in_home()]
+    
+    homes = {}
+    if selected('home') or selected('permissions'):
+        homes = Home.find_by_ids({sl.data['home_id'] for sl in home_lists})
+    
+    creators = {}
+    if selected('creator'):
+        creators = User.find_many(
+            {sl.data['user_id'] for sl in home_lists if not sl.is_owned_by(user_id)}, fields=PUBLIC_PROFILE_FIELDS
+        )
+    
+    enriched_lists = []
+    for sl in shopping_lists:
+        list_dict = sl.to_dict(fields, stringify_ids=False)
+        
+        # Add creator info if list is in a home and creator is different from current user
+        if selected('creator') and sl.is_in_home() and not sl.is_owned_by(user_id):
+            creator = creators.get(str(sl.data['user_id']))
+            if creator:
+                list_dict['creator'] = {
+                    'id': creator.id,
+                    'name': creator.data['name'],
+                    'photo': creator.photo_url('small')
+                }
+        
+        # Add home info if list is in a home
+        if selected('home') and sl.is_in_home():
+            home = homes.get(str(sl.data['home_id']))
+            if home:
+                list_dict['home'] = {
+                    'id': home.id,
+                    'name': home.data['name']
+                }
+        
+        # Add permission info
+        if selected('permissions'):
+            list_dict['permissions'] = {
+                'can_edit': sl.can_user_edit(user_id, homes),
+                'can_complete_items': sl.can_user_complete_items(user_id, homes)
+            }
+        
+        enriched_lists.append(list_dict)
+    
+    return enriched_lists
+
+def shopping_lists_etag(list_validators, user_id, fields=None):
+    """Compute the ETag of enriched lists from their validators (see find_validators)
+    
+    Covers every document enrich_shopping_lists reads: the lists themselves,
+    their homes (names and membership) and their creators, each by updatedAt.
+    """
+    def selected(field):
+        return fields is None or field in fields
+    
+    home_lists = [validator for validator in list_validators if validator.get('home_id')]
+    
+    home_stamps = []
+    if selected('home') or selected('permissions'):
+        homes = Home.find_by_ids({validator['home_id'] for validator in home_lists})
+        home_stamps = sorted((home_id, home.data.get('updatedAt', 0)) for home_id, home in homes.items())
+    
+    creator_stamps = []
+    if selected('creator'):
+        creator_ids = {validator['user_id'] for validator in home_lists if str(validator['user_id']) != str(user_id)}
+        creators = User.find_many(creator_ids, fields=('updatedAt',))
+        creator_stamps = sorted((creator_id, creator.data.get('updatedAt', 0)) for creator_id, creator in creators.items())
+    
+    list_stamps = [
+        (str(validator['_id']), validator.get('updatedAt', 0), validator.get('version', 0))
+        for validator in list_validators
+    ]
+    return compute_etag(str(user_id), list_stamps, home_stamps, creator_stamps)
+
+def version_conflict_response(error):
+    """Build the 409 response for a stale write, carrying only the conflicting fields"""
+    if error.current_version is None:
+        return jsonify({'message': 'Shopping list not found'}), 404
+    
+    return jsonify({
+        'message': 'Shopping list was changed by someone else',
+        'version': error.current_version,
+        'conflicts': error.conflicts
+    }), 409
+
 @shopping_bp.route('/sync-check', methods=['GET'])
 @auth_required
 def check_shopping_sync_status():
@@ -16,14 +115,14 @@ def check_shopping_sync_status():
         include_archived = request.args.get('include_archived', 'false').lower() == 'true'
         
         # Get only the timestamps, not full data
-        shopping_lists = ShoppingList.find_by_user_id(user_id, include_archived)
+        list_timestamps = ShoppingList.find_sync_timestamps(user_id, include_archived)
         
         # Return only list IDs and timestamps
         timestamps = []
-        for sl in shopping_lists:
+        for list_data in list_timestamps:
             timestamps.append({
-                '_id': str(sl.id),
-                'updatedAt': sl.data.get('updatedAt', 0)
+                '_id': str(list_data['_id']),
+                'updatedAt': list_data.get('updatedAt', 0)
             })
         
         return jsonify({
@@ -34,54 +133,131 @@ def check_shopping_sync_status():
         current_app.logger.error(f"Shopping sync check error: {e}")
         return jsonify({'message': 'Failed to check shopping sync status'}), 500
 
+def parse_changes_params():
+    """Get (since, include_archived, known_ids) for /changes; raises ValueError when malformed
+    
+    GET takes them from the query string (known as comma-separated IDs),
+    POST from a JSON body (known as a list), which has no URL length limit.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        known_ids = data.get('known', [])
+        if not isinstance(known_ids, list) or not all(isinstance(list_id, str) for list_id in known_ids):
+            raise ValueError('known must be a list of list IDs')
+        include_archived = data.get('include_archived', False) is True
+        since = data.get('since', 0)
+    else:
+        known_ids = request.args.get('known', '').split(',')
+        include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+        since = request.args.get('since', '0')
+    
+    try:
+        since = int(since)
+    except (TypeError, ValueError):
+        raise ValueError('since must be a Unix timestamp in milliseconds')
+    return since, include_archived, [list_id for list_id in known_ids if list_id]
+
+@shopping_bp.route('/changes', methods=['GET', 'POST'])
+@auth_required
+def get_shopping_changes():
+    """Get lists changed since a client watermark, plus tombstones for lists that went away
+    
+    Deleted lists are reported for CHANGES_TOMBSTONE_RETENTION at most, so
+    since=0 does not return every deletion ever; lists deleted earlier are
+    reported as access_removed when the client sends them as known.
+    """
+    try:
+        user_id = get_jwt_identity()
+        
+        # Optional known IDs the client holds, to detect removed access
+        try:
+            since, include_archived, known_ids = parse_changes_params()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        # Taken before querying so writes racing with this request are seen next time
+        watermark = get_unix_timestamp()
+        deleted_since = watermark - current_app.config['CHANGES_TOMBSTONE_RETENTION'] * 1000
+        
+        changed_lists = ShoppingList.find_changed_since(user_id, since, deleted_since)
+        
+        visible_statuses = ['active', 'completed', 'archived'] if include_archived else ['active']
+        visible_lists = []
+        tombstones = []
+        for sl in changed_lists:
+            status = sl.data.get('status') or ('archived' if sl.data.get('archived') else 'active')
+            if status in visible_statuses:
+                visible_lists.append(sl)
+            else:
+                tombstones.append({'_id': sl.id, 'reason': status, 'updatedAt': sl.data.get('updatedAt', 0)})
+        
+        if known_ids:
+            accessible_ids = set(ShoppingList.find_accessible_ids(user_id, known_ids))
+            seen_ids = {tombstone['_id'] for tombstone in tombstones}
+            for list_id in known_ids:
+                if list_id not in accessible_ids and list_id not in seen_ids:
+                    tombstones.append({'_id': list_id, 'reason': 'access_removed', 'updatedAt': watermark})
+        
+        return jsonify({
+            'shopping_lists': enrich_shopping_lists(visible_lists, user_id),
+            'tombstones': tombstones,
+            'watermark': watermark
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get shopping changes error: {e}")
+        return jsonify({'message': 'Failed to get shopping list changes'}), 500
+
 @shopping_bp.route('/lists', methods=['GET'])
 @auth_required
 def get_shopping_lists():
-    """Get all shopping lists for the current user, with optional home filtering"""
+    """Get all shopping lists for the current user, with optional home filtering
+    
+    Optional keyset pagination: `limit` (up to MAX_PAGE_SIZE) and `after`, the
+    `next_cursor` of the previous page. `summary=true` leaves out the items,
+    and `fields=name,color,...` returns only the selected fields (plus _id).
+    """
     try:
         user_id = get_jwt_identity()
         include_archived = request.args.get('include_archived', 'false').lower() == 'true'
         home_id = request.args.get('home_id')  # Optional home filter
+        summary = request.args.get('summary', 'false').lower() == 'true'
         
-        shopping_lists = ShoppingList.find_by_user_id(user_id, include_archived, home_id)
-        
-        # Enrich lists with creator information for home lists
-        enriched_lists = []
-        for sl in shopping_lists:
-            list_dict = sl.to_dict()
-            
-            # Add creator info if list is in a home and creator is different from current user
-            if list_dict.get('home_id') and list_dict['user_id'] != user_id:
-                from models import User
-                creator = User.find_by_id(list_dict['user_id'])
-                if creator:
-                    list_dict['creator'] = {
-                        'id': creator.id,
-                        'name': creator.data['name'],
-                        'photo': creator.data.get('photo')
-                    }
-            
-            # Add home info if list is in a home
-            if list_dict.get('home_id'):
-                from home_models import Home
-                home = Home.find_by_id(list_dict['home_id'])
-                if home:
-                    list_dict['home'] = {
-                        'id': home.id,
-                        'name': home.data['name']
-                    }
-            
-            # Add permission info
-            list_dict['permissions'] = {
-                'can_edit': sl.can_user_edit(user_id),
-                'can_complete_items': sl.can_user_complete_items(user_id)
-            }
-            
-            enriched_lists.append(list_dict)
+        limit = request.args.get('limit', type=int)
+        if 'limit' in request.args and not (limit and 1 <= limit <= MAX_PAGE_SIZE):
+            return jsonify({'message': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
         
-        return jsonify({
-            'shopping_lists': enriched_lists
-        }), 200
+        try:
+            after = ShoppingList.parse_cursor(request.args['after']) if request.args.get('after') else None
+            fields = ShoppingList.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        # Fetch one extra list to tell whether another page follows
+        page_limit = limit + 1 if limit else None
+        
+        etag = shopping_lists_etag(
+            ShoppingList.find_validators(user_id, include_archived, home_id, after=after, limit=page_limit),
+            user_id, fields
+        )
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
+        shopping_lists = ShoppingList.find_by_user_id(
+            user_id, include_archived, home_id,
+            after=after, limit=page_limit, summary=summary, fields=fields
+        )
+        
+        response = {}
+        if limit:
+            has_more = len(shopping_lists) > limit
+            shopping_lists = shopping_lists[:limit]
+            response['next_cursor'] = shopping_lists[-1].cursor() if has_more else None
+        
+        response['shopping_lists'] = enrich_shopping_lists(shopping_lists, user_id, fields)
+        
+        return with_etag(jsonify(response), etag), 200
         
     except Exception as e:
         current_app.logger.error(f"Get shopping lists error: {e}")
@@ -110,7 +286,6 @@ def create_shopping_list():
         
         # Validate home_id if provided
         if home_id:
-            from home_models import Home
             home = Home.find_by_id(home_id)
             if not home:
                 return jsonify({'message': 'Home not found'}), 404
@@ -123,7 +298,7 @@ def create_shopping_list():
         
         result = jsonify({
             'message': 'Shopping list created successfully',
-            'shopping_list': shopping_list.to_dict()
+            'shopping_list': shopping_list.to_dict(stringify_ids=False)
         })
         
         current_app.logger.info(f"Returning shopping list data: {shopping_list.to_dict()}")
@@ -136,7 +311,7 @@ def create_shopping_list():
 @shopping_bp.route('/lists/<list_id>', methods=['GET'])
 @auth_required
 def get_shopping_list(list_id):
-    """Get a specific shopping list"""
+    """Get a specific shopping list, optionally only the fields selected with fields="""
     try:
         user_id = get_jwt_identity()
         
@@ -144,42 +319,31 @@ def get_shopping_list(list_id):
         if not (ObjectId.is_valid(list_id) or '_' in list_id):
             return jsonify({'message': 'Invalid list ID'}), 400
         
-        shopping_list = ShoppingList.find_by_id(list_id, user_id)
+        try:
+            fields = ShoppingList.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        validator = ShoppingList.find_validator(list_id, user_id)
+        if not validator:
+            return jsonify({'message': 'Shopping list not found'}), 404
+        
+        etag = shopping_lists_etag([validator], user_id, fields)
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
+        shopping_list = ShoppingList.find_by_id(list_id, user_id, fields)
         
         if not shopping_list:
             return jsonify({'message': 'Shopping list not found'}), 404
         
         # Add permission info and enriched data
-        list_dict = shopping_list.to_dict()
-        list_dict['permissions'] = {
-            'can_edit': shopping_list.can_user_edit(user_id),
-            'can_complete_items': shopping_list.can_user_complete_items(user_id)
-        }
-        
-        # Add creator info if different from current user
-        if list_dict.get('home_id') and list_dict['user_id'] != user_id:
-            from models import User
-            creator = User.find_by_id(list_dict['user_id'])
-            if creator:
-                list_dict['creator'] = {
-                    'id': creator.id,
-                    'name': creator.data['name'],
-                    'photo': creator.data.get('photo')
-                }
+        list_dict = enrich_shopping_lists([shopping_list], user_id, fields)[0]
         
-        # Add home info if list is in a home
-        if list_dict.get('home_id'):
-            from home_models import Home
-            home = Home.find_by_id(list_dict['home_id'])
-            if home:
-                list_dict['home'] = {
-                    'id': home.id,
-                    'name': home.data['name']
-                }
-        
-        return jsonify({
+        return with_etag(jsonify({
             'shopping_list': list_dict
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         current_app.logger.error(f"Get shopping list error: {e}")
@@ -233,13 +397,24 @@ def update_shopping_list(list_id):
                 update_data['archived'] = (status == 'archived')
         
         if 'items' in data:
-            update_data['items'] = data['items']  # Accept entire items array
+            items = data['items']  # Accept entire items array
+            if not isinstance(items, list) or not all(isinstance(item, dict) and item.get('id') for item in items):
+                return jsonify({'message': 'items must be a list of items, each with an id'}), 400
+            update_data['items'] = items
+        
+        # Optional optimistic concurrency check against the list version
+        expected_version = data.get('version')
+        if expected_version is not None and not isinstance(expected_version, int):
+            return jsonify({'message': 'version must be an integer'}), 400
         
-        shopping_list.update(update_data)
+        try:
+            shopping_list.update(update_data, expected_version)
+        except VersionConflictError as e:
+            return version_conflict_response(e)
         
         return jsonify({
             'message': 'Shopping list updated successfully',
-            'shopping_list': shopping_list.to_dict()
+            'shopping_list': shopping_list.to_dict(stringify_ids=False)
         }), 200
         
     except Exception as e:
@@ -275,7 +450,7 @@ def complete_shopping_list(list_id):
         
         return jsonify({
             'message': 'Shopping list marked as completed',
-            'shopping_list': shopping_list.to_dict()
+            'shopping_list': shopping_list.to_dict(stringify_ids=False)
         }), 200
         
     except Exception as e:
@@ -332,7 +507,7 @@ def archive_shopping_list(list_id):
         
         return jsonify({
             'message': 'Shopping list archived successfully',
-            'shopping_list': shopping_list.to_dict()
+            'shopping_list': shopping_list.to_dict(stringify_ids=False)
         }), 200
         
     except Exception as e:
@@ -359,44 +534,73 @@ def unarchive_shopping_list(list_id):
         
         return jsonify({
             'message': 'Shopping list unarchived successfully',
-            'shopping_list': shopping_list.to_dict()
+            'shopping_list': shopping_list.to_dict(stringify_ids=False)
         }), 200
         
     except Exception as e:
         current_app.logger.error(f"Unarchive shopping list error: {e}")
         return jsonify({'message': 'Failed to unarchive shopping list'}), 500
 
-# REMOVED: Individual item routes - using simple items array sync instead
-# Items are now synced as a complete array in the shopping list update endpoint
-
-# @shopping_bp.route('/lists/<list_id>/items', methods=['POST'])
-# @auth_required
-# @validate_json('name')
-# def add_item_to_list(list_id):
-#     """Add an item to a shopping list"""
-#     [Individual item management routes removed - items synced as array]
+# Item Routes
 
-# @shopping_bp.route('/lists/<list_id>/items/<item_id>', methods=['PUT'])
-# @auth_required  
-# def update_item_in_list(list_id, item_id):
-#     """Update an item in a shopping list"""
-#     [Individual item management routes removed - items synced as array]
-
-# @shopping_bp.route('/lists/<list_id>/items/<item_id>', methods=['DELETE'])
-# @auth_required
-# def remove_item_from_list(list_id, item_id):
-#     """Remove an item from a shopping list"""
-#     [Individual item management routes removed - items synced as array]
+@shopping_bp.route('/lists/<list_id>/items/batch', methods=['POST'])
+@auth_required
+@validate_json('ops')
+def patch_list_items(list_id):
+    """Apply an ordered batch of item ops (add/update/remove/reorder) to a shopping list"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        # Accept both MongoDB ObjectIds and custom frontend-generated IDs
+        if not (ObjectId.is_valid(list_id) or '_' in list_id):
+            return jsonify({'message': 'Invalid list ID'}), 400
+        
+        shopping_list = ShoppingList.find_by_id(list_id, user_id)
+        
+        if not shopping_list:
+            return jsonify({'message': 'Shopping list not found'}), 404
+        
+        # Check if user can edit this list
+        if not shopping_list.can_user_edit(user_id):
+            return jsonify({'message': 'You do not have permission to edit this list'}), 403
+        
+        expected_version = data.get('version')
+        if expected_version is not None and not isinstance(expected_version, int):
+            return jsonify({'message': 'version must be an integer'}), 400
+        
+        try:
+            shopping_list.apply_item_ops(data['ops'], expected_version)
+        except VersionConflictError as e:
+            return version_conflict_response(e)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        return jsonify({
+            'message': 'Shopping list items updated successfully',
+            'shopping_list': shopping_list.to_dict(stringify_ids=False)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Patch list items error: {e}")
+        return jsonify({'message': 'Failed to update shopping list items'}), 500
 
 # Statistics Routes
 
 @shopping_bp.route('/stats', methods=['GET'])
 @auth_required
 def get_user_stats():
-    """Get shopping list statistics for the current user"""
+    """Get shopping list statistics for the current user, with optional breakdowns"""
     try:
         user_id = get_jwt_identity()
-        stats = ShoppingListStats.get_user_stats(user_id)
+        
+        # Optional comma-separated breakdowns: home, category
+        breakdowns = [name for name in request.args.get('breakdown', '').split(',') if name]
+        
+        try:
+            stats = ShoppingListStats.get_user_stats(user_id, breakdowns)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         return jsonify({
             'stats': stats
@@ -0,0 +1,72 @@
+"""
+Shared fixtures for the model tests
+
+The tests run the models against a scratch database on a real MongoDB
+(MONGO_URI, default mongodb://localhost:27017/) and are skipped when no
+server is reachable.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+TEST_DATABASE = 'shopping_list_test'
+
+
+@pytest.fixture(scope='session')
+def database():
+    """Connect to the scratch database, dropping it when the session ends"""
+    from pymongo.errors import PyMongoError
+    from database import db
+
+    try:
+        db.initialize(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'), TEST_DATABASE)
+    except PyMongoError as e:
+        pytest.skip(f"MongoDB not available: {e}")
+    yield db
+    db.client.drop_database(TEST_DATABASE)
+    db.close()
+
+
+@pytest.fixture(params=('embedded', 'collection'))
+def item_storage(request, database):
+    """Run a test once per item storage mode"""
+    from shopping_models import ShoppingList, ITEM_STORAGE_EMBEDDED
+
+    ShoppingList.configure(item_storage=request.param)
+    yield request.param
+    ShoppingList.configure(item_storage=ITEM_STORAGE_EMBEDDED)
+
+
+@pytest.fixture
+def client(database):
+    """Test client for the shopping routes"""
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+    from config import config
+    from json_provider import BSONJSONProvider
+    from shopping_routes import shopping_bp
+
+    app = Flask(__name__)
+    app.json = BSONJSONProvider(app)
+    app.config.from_object(config['production'])
+    app.config.update(TESTING=True, JWT_SECRET_KEY='test-secret-key-long-enough-for-hs256')
+    JWTManager(app)
+    app.register_blueprint(shopping_bp)
+    return app.test_client()
+
+
+@pytest.fixture
+def user(client, database):
+    """A stored user and the Authorization header for their requests"""
+    from bson import ObjectId
+    from flask_jwt_extended import create_access_token
+
+    user_id = ObjectId()
+    database.get_collection('users').insert_one({'_id': user_id, 'email': f'{user_id}@example.com', 'name': 'Test'})
+    with client.application.app_context():
+        token = create_access_token(identity=str(user_id))
+    return str(user_id), {'Authorization': f'Bearer {token}'}
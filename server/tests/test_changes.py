@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip('pymongo')
+
+from shopping_models import ShoppingList
+
+
+def test_changes_accepts_known_ids_in_post_body(client, user):
+    user_id, headers = user
+    kept = ShoppingList.create(user_id, 'Groceries')
+    gone_id = 'list_gone'
+
+    response = client.post('/api/shopping/changes', json={'since': 0, 'known': [kept.id, gone_id]}, headers=headers)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [sl['_id'] for sl in body['shopping_lists']] == [kept.id]
+    assert body['tombstones'] == [{'_id': gone_id, 'reason': 'access_removed', 'updatedAt': body['watermark']}]
+
+
+def test_changes_rejects_malformed_known_ids(client, user):
+    _, headers = user
+
+    response = client.post('/api/shopping/changes', json={'since': 0, 'known': 'a,b'}, headers=headers)
+
+    assert response.status_code == 400
+
+
+def test_changes_leaves_out_old_deletions(client, user, database):
+    user_id, headers = user
+    recent = ShoppingList.create(user_id, 'Recent')
+    recent.delete()
+    old = ShoppingList.create(user_id, 'Old')
+    old.delete()
+    database.get_collection('shopping_lists').update_one({'_id': old.data['_id']}, {'$set': {'updatedAt': 1}})
+
+    body = client.get('/api/shopping/changes?since=0', headers=headers).get_json()
+    assert [tombstone['_id'] for tombstone in body['tombstones']] == [recent.id]
+
+    body = client.get(f'/api/shopping/changes?since=0&known={old.id}', headers=headers).get_json()
+    assert {(tombstone['_id'], tombstone['reason']) for tombstone in body['tombstones']} == {
+        (recent.id, 'deleted'), (old.id, 'access_removed')
+    }
@@ -0,0 +1,122 @@
+import pytest
+
+pytest.importorskip('pymongo')
+
+from bson import ObjectId
+
+from shopping_models import ShoppingList, VersionConflictError, MAX_WRITE_ATTEMPTS
+
+
+def make_list(*names):
+    """Create a list with one item per name"""
+    items = [ShoppingList._new_item(name, item_id=name) for name in names]
+    return ShoppingList.create(str(ObjectId()), 'Groceries', items=items)
+
+
+def stored_ids(shopping_list):
+    """Item ids of the stored list, in display order"""
+    return [item['id'] for item in ShoppingList.find_by_id(shopping_list.id).data['items']]
+
+
+def test_reorder_ignores_repeated_ids(item_storage):
+    shopping_list = make_list('milk', 'eggs', 'bread')
+
+    shopping_list.apply_item_ops([{'op': 'reorder', 'order': ['bread', 'milk', 'bread']}])
+
+    assert stored_ids(shopping_list) == ['bread', 'milk', 'eggs']
+
+
+def test_reorder_rejects_non_id_entries(item_storage):
+    shopping_list = make_list('milk')
+
+    with pytest.raises(ValueError):
+        shopping_list.apply_item_ops([{'op': 'reorder', 'order': ['milk', None]}])
+
+
+def test_add_rejects_existing_id(item_storage):
+    shopping_list = make_list('milk', 'eggs')
+
+    with pytest.raises(ValueError):
+        shopping_list.apply_item_ops([{'op': 'add', 'item': {'id': 'milk', 'name': 'Milk'}}])
+
+    assert stored_ids(shopping_list) == ['milk', 'eggs']
+
+
+def test_add_rejects_id_added_by_another_writer(item_storage):
+    shopping_list = make_list('milk')
+    ShoppingList.find_by_id(shopping_list.id).apply_item_ops([{'op': 'add', 'item': {'id': 'eggs', 'name': 'Eggs'}}])
+
+    # shopping_list still holds the copy without eggs
+    with pytest.raises(ValueError):
+        shopping_list.apply_item_ops([{'op': 'add', 'item': {'id': 'eggs', 'name': 'Eggs'}}])
+
+    assert stored_ids(shopping_list) == ['milk', 'eggs']
+
+
+def test_add_after_remove_of_same_id(item_storage):
+    shopping_list = make_list('milk')
+
+    shopping_list.apply_item_ops([
+        {'op': 'remove', 'id': 'milk'},
+        {'op': 'add', 'item': {'id': 'milk', 'name': 'Oat milk'}},
+    ])
+
+    assert stored_ids(shopping_list) == ['milk']
+
+
+def test_stale_item_version_conflicts(item_storage):
+    shopping_list = make_list('milk', 'eggs')
+    ShoppingList.find_by_id(shopping_list.id).apply_item_ops([{'op': 'update', 'id': 'milk', 'fields': {'completed': True}}])
+
+    with pytest.raises(VersionConflictError) as error:
+        shopping_list.apply_item_ops([{'op': 'update', 'id': 'milk', 'version': 1, 'fields': {'quantity': 3}}])
+
+    assert [item['id'] for item in error.value.conflicts['items']] == ['milk']
+    stored = ShoppingList.find_by_id(shopping_list.id).data['items'][0]
+    assert stored['quantity'] == 1
+    assert stored['version'] == 2
+
+
+def test_stale_list_version_without_item_conflict_applies(item_storage):
+    shopping_list = make_list('milk', 'eggs')
+    ShoppingList.find_by_id(shopping_list.id).apply_item_ops([{'op': 'update', 'id': 'milk', 'fields': {'completed': True}}])
+
+    shopping_list.apply_item_ops([{'op': 'update', 'id': 'eggs', 'version': 1, 'fields': {'completed': True}}], expected_version=1)
+
+    stored = ShoppingList.find_by_id(shopping_list.id)
+    assert stored.data['completed_count'] == 2
+    assert stored.data['version'] == 3
+
+
+def test_stale_list_version_with_item_conflict_raises(item_storage):
+    shopping_list = make_list('milk', 'eggs')
+    ShoppingList.find_by_id(shopping_list.id).apply_item_ops([{'op': 'remove', 'id': 'eggs'}])
+
+    with pytest.raises(VersionConflictError) as error:
+        shopping_list.apply_item_ops([{'op': 'update', 'id': 'eggs', 'version': 1, 'fields': {'completed': True}}], expected_version=1)
+
+    assert error.value.conflicts['items'] == [{'id': 'eggs', 'removed': True}]
+    assert ShoppingList.find_by_id(shopping_list.id).data['item_count'] == 1
+
+
+def test_ops_on_deleted_list_conflict(item_storage, database):
+    shopping_list = make_list('milk')
+    database.get_collection('shopping_lists').delete_one({'_id': shopping_list.data['_id']})
+
+    with pytest.raises(VersionConflictError) as error:
+        shopping_list.apply_item_ops([{'op': 'add', 'item': {'name': 'Eggs'}}])
+
+    assert error.value.current_version is None
+
+
+def test_item_ops_stop_retrying_after_max_attempts(monkeypatch):
+    shopping_list = ShoppingList({'_id': ObjectId(), 'items': [], 'version': 1})
+    attempts = []
+    monkeypatch.setattr(ShoppingList, '_apply_item_ops_to_embedded', lambda self, *args: attempts.append(args) and False)
+    monkeypatch.setattr(ShoppingList, '_item_version_conflict', lambda self, *args: VersionConflictError(len(attempts) + 1, {}))
+
+    with pytest.raises(VersionConflictError):
+        shopping_list.apply_item_ops([{'op': 'add', 'item': {'name': 'Milk'}}], expected_version=1)
+
+    assert len(attempts) == MAX_WRITE_ATTEMPTS
+    assert [args[-1] for args in attempts] == [1, 2, 3]
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip('pymongo')
+
+from bson import ObjectId
+
+from shopping_models import ShoppingList, ShoppingListStats
+
+
+@pytest.fixture
+def legacy_list(database, user):
+    """A list stored before lists had a status field"""
+    user_id, _ = user
+    list_data = {
+        '_id': ObjectId(),
+        'user_id': ObjectId(user_id),
+        'name': 'Old groceries',
+        'archived': False,
+        'home_id': None,
+        'items': [{'id': 'milk', 'name': 'Milk', 'category': 'Dairy', 'completed': False}],
+        'createdAt': 1,
+        'updatedAt': 1,
+    }
+    database.get_collection('shopping_lists').insert_one(list_data)
+    return str(list_data['_id'])
+
+
+def test_lists_without_status_stay_listed(user, legacy_list):
+    user_id, _ = user
+
+    listed = ShoppingList.find_by_user_id(user_id, include_archived=True)
+
+    assert [sl.id for sl in listed] == [legacy_list]
+    assert ShoppingList.find_accessible_ids(user_id, [legacy_list]) == [legacy_list]
+    assert [group['category'] for group in ShoppingListStats.get_category_breakdown(user_id)] == ['Dairy']
+
+
+def test_changes_do_not_tombstone_lists_without_status(client, user, legacy_list):
+    _, headers = user
+
+    response = client.post('/api/shopping/changes', json={'since': 2, 'known': [legacy_list]}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['tombstones'] == []
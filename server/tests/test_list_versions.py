@@ -0,0 +1,120 @@
+import copy
+
+import pytest
+
+pytest.importorskip('pymongo')
+
+from bson import ObjectId
+
+from shopping_models import ShoppingList, VersionConflictError
+
+
+def make_list(user_id, *names):
+    """Create a list owned by user_id with one item per name"""
+    items = [ShoppingList._new_item(name, item_id=name) for name in names]
+    return ShoppingList.create(user_id, 'Groceries', items=items)
+
+
+def put_items(client, headers, shopping_list, items, version):
+    return client.put(f'/api/shopping/lists/{shopping_list.id}', json={'items': items, 'version': version}, headers=headers)
+
+
+def with_completed(items, item_id):
+    """Copy of items with one item ticked"""
+    items = copy.deepcopy(items)
+    for item in items:
+        if item['id'] == item_id:
+            item['completed'] = True
+    return items
+
+
+def test_stale_items_puts_conflict(client, user, item_storage):
+    user_id, headers = user
+    shopping_list = make_list(user_id, 'milk', 'eggs')
+    stale_items = shopping_list.data['items']
+
+    first = put_items(client, headers, shopping_list, with_completed(stale_items, 'milk'), 1)
+    assert first.status_code == 200
+
+    second = put_items(client, headers, shopping_list, with_completed(stale_items, 'eggs'), 1)
+    assert second.status_code == 409
+    assert [item['id'] for item in second.get_json()['conflicts']['items']] == ['milk']
+
+    stored = {item['id']: item for item in ShoppingList.find_by_id(shopping_list.id).data['items']}
+    assert stored['milk']['completed'] is True
+    assert stored['milk']['version'] == 2
+    assert stored['eggs']['completed'] is False
+    assert stored['eggs']['version'] == 1
+
+
+def test_stale_items_put_does_not_restore_removed_item(client, user, item_storage):
+    user_id, headers = user
+    shopping_list = make_list(user_id, 'milk', 'eggs')
+    stale_items = shopping_list.data['items']
+
+    first = put_items(client, headers, shopping_list, [item for item in stale_items if item['id'] != 'eggs'], 1)
+    assert first.status_code == 200
+
+    second = put_items(client, headers, shopping_list, with_completed(stale_items, 'milk'), 1)
+    assert second.status_code == 409
+    assert {'id': 'eggs', 'removed': True} in second.get_json()['conflicts']['items']
+
+    assert [item['id'] for item in ShoppingList.find_by_id(shopping_list.id).data['items']] == ['milk']
+
+
+def test_items_put_without_item_changes_merges(client, user, item_storage):
+    user_id, headers = user
+    shopping_list = make_list(user_id, 'milk')
+    stale_items = shopping_list.data['items']
+
+    assert client.put(f'/api/shopping/lists/{shopping_list.id}', json={'name': 'Weekly', 'version': 1}, headers=headers).status_code == 200
+    assert put_items(client, headers, shopping_list, with_completed(stale_items, 'milk'), 1).status_code == 200
+
+    stored = ShoppingList.find_by_id(shopping_list.id)
+    assert stored.data['name'] == 'Weekly'
+    assert stored.data['items'][0]['completed'] is True
+
+
+def test_single_item_writes_record_stored_version(database, item_storage):
+    shopping_list = make_list(str(ObjectId()), 'milk')
+    stale = ShoppingList.find_by_id(shopping_list.id)
+
+    shopping_list.add_item('Eggs')
+    stale.update_item('milk', {'completed': True})
+
+    stored = database.get_collection('shopping_lists').find_one({'_id': shopping_list.data['_id']})
+    assert stored['version'] == 3
+    assert stored['field_versions']['items'] == 3
+    assert stale.data['version'] == 3
+
+
+@pytest.mark.parametrize('items', ['milk', [{'name': 'Milk'}], ['milk'], [None]])
+def test_items_put_rejects_malformed_items(client, user, items):
+    user_id, headers = user
+    shopping_list = make_list(user_id, 'milk')
+
+    assert put_items(client, headers, shopping_list, items, 1).status_code == 400
+
+
+def test_update_stops_retrying_after_max_attempts(monkeypatch):
+    import shopping_models
+
+    class LosingCollection:
+        """Every guarded write matches nothing"""
+        def __init__(self):
+            self.queries = []
+
+        def find_one_and_update(self, query, *args, **kwargs):
+            self.queries.append(dict(query))
+            return None
+
+    collection = LosingCollection()
+    monkeypatch.setattr(shopping_models.db, 'get_collection', lambda name: collection)
+    monkeypatch.setattr(ShoppingList, '_version_conflict',
+                        lambda self, update_data, expected: VersionConflictError(expected + 1, {}))
+    shopping_list = ShoppingList({'_id': ObjectId(), 'version': 1})
+
+    with pytest.raises(VersionConflictError):
+        shopping_list.update({'name': 'Weekly'}, 1)
+
+    assert [query['version'] for query in collection.queries] == [1, 2, 3]
@@ -0,0 +1,78 @@
+import pytest
+
+pytest.importorskip('pymongo')
+
+from bson import ObjectId
+
+import photo_store
+from photo_store import PhotoStore, ORIGINAL_SIZE, PHOTO_BUCKET
+
+@pytest.fixture
+def photo():
+    """Distinct image bytes per test, so no test sees another's stored photo"""
+    return 'image/png', ObjectId().binary
+
+
+@pytest.fixture
+def users(database):
+    yield database.get_collection('users')
+    database.get_collection('users').delete_many({'photo_id': {'$exists': True}})
+
+
+def test_release_keeps_held_photo(database, photo):
+    photo_id = PhotoStore.save(*photo)
+
+    # Saved but no user points at it yet: a concurrent release must not delete it
+    assert PhotoStore.release(photo_id) is False
+    assert PhotoStore.exists(photo_id)
+
+    PhotoStore.settle(photo_id)
+    assert PhotoStore.release(photo_id) is True
+    assert not PhotoStore.exists(photo_id)
+
+
+class PointedAfterFirstCheck:
+    """Users collection where a user is pointed at the photo just after the first reference check"""
+
+    def __init__(self, users, photo_id):
+        self.users = users
+        self.photo_id = photo_id
+        self.checked = False
+
+    def find_one(self, *args, **kwargs):
+        if not self.checked:
+            self.checked = True
+            self.users.insert_one({'_id': ObjectId(), 'photo_id': self.photo_id})
+            return None
+        return self.users.find_one(*args, **kwargs)
+
+
+def test_release_after_user_points_at_photo(database, users, photo, monkeypatch):
+    photo_id = PhotoStore.save(*photo)
+    PhotoStore.settle(photo_id)
+
+    get_collection = database.get_collection
+    pointed = PointedAfterFirstCheck(users, photo_id)
+    monkeypatch.setattr(database, 'get_collection', lambda name: pointed if name == 'users' else get_collection(name))
+
+    assert PhotoStore.release(photo_id) is False
+    monkeypatch.undo()
+    assert PhotoStore.open(photo_id, ORIGINAL_SIZE) == photo
+
+
+def test_save_during_release_stores_photo_again(database, photo, monkeypatch):
+    photo_id = PhotoStore.save(*photo)
+    PhotoStore.settle(photo_id)
+
+    # A release has claimed the photo and deleted its chunks
+    files = database.get_collection(f"{PHOTO_BUCKET}.files")
+    original_id = f"{photo_id}-{ORIGINAL_SIZE}"
+    files.update_one({'_id': original_id}, {'$set': {'metadata.releasing': True}})
+    database.get_collection(f"{PHOTO_BUCKET}.chunks").delete_many({'files_id': original_id})
+
+    # ...and finishes while save() waits for it
+    monkeypatch.setattr(photo_store.time, 'sleep', lambda seconds: files.delete_one({'_id': original_id}))
+
+    assert PhotoStore.save(*photo) == photo_id
+    assert PhotoStore.open(photo_id, ORIGINAL_SIZE) == photo
+    assert PhotoStore.release(photo_id) is False
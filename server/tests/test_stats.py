@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip('pymongo')
+
+from bson import ObjectId
+
+from home_models import Home
+from shopping_models import ShoppingList, ShoppingListStats, StatsRollup
+
+
+def test_stats_keep_own_lists_in_a_home_the_user_left(database):
+    owner_id, member_id = str(ObjectId()), str(ObjectId())
+    home = Home.create(owner_id, 'Flat')
+    home.add_member(member_id)
+    ShoppingList.create(member_id, 'Groceries', items=[ShoppingList._new_item('Milk')], home_id=str(home.data['_id']))
+
+    home.remove_member(member_id)
+
+    stats = ShoppingListStats.get_user_stats(member_id, ['home'])
+    assert stats['total_lists'] == 1
+    assert stats['total_items'] == 1
+    assert [entry['home_id'] for entry in stats['by_home']] == [str(home.data['_id'])]
+    # The home keeps counting the list for its members
+    assert ShoppingListStats.get_user_stats(owner_id)['total_lists'] == 1
+
+
+def test_stats_count_own_lists_in_a_current_home_once(database):
+    user_id = str(ObjectId())
+    home = Home.create(user_id, 'Flat')
+    ShoppingList.create(user_id, 'Groceries', home_id=str(home.data['_id']))
+
+    assert ShoppingListStats.get_user_stats(user_id)['total_lists'] == 1
+
+
+def test_reconcile_rebuilds_owner_rollups(database):
+    user_id = str(ObjectId())
+    home = Home.create(str(ObjectId()), 'Flat')
+    ShoppingList.create(user_id, 'Groceries', home_id=str(home.data['_id']))
+    scope_id = StatsRollup.owner_scope_id(ObjectId(user_id), home.data['_id'])
+    database.get_collection('user_stats').delete_one({'_id': scope_id})
+
+    StatsRollup.reconcile()
+
+    rollup = database.get_collection('user_stats').find_one({'_id': scope_id})
+    assert (rollup['scope'], rollup['user_id'], rollup['lists']) == ('owner', ObjectId(user_id), 1)
+    assert ShoppingListStats.get_user_stats(user_id)['total_lists'] == 1
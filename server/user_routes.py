@@ -2,12 +2,16 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import User
 from middleware import auth_required, validate_json
-import base64
+from photo_store import PhotoStore, PHOTO_SIZES, ORIGINAL_SIZE
+from etag import compute_etag, not_modified, with_etag
 import os
 from datetime import datetime
 
 user_bp = Blueprint('user', __name__, url_prefix='/api/user')
 
+# Photo URLs change with their content, so clients may cache them for a year
+PHOTO_CACHE_MAX_AGE = 365 * 24 * 3600
+
 @user_bp.route('/sync-check', methods=['GET'])
 @auth_required
 def check_sync_status():
@@ -51,7 +55,12 @@ def get_profile():
         if not user.data.get('updatedAt'):
             user.update({})  # This will set updatedAt
         
-        return jsonify({'user': user.to_dict()}), 200
+        etag = compute_etag(user.id, user.data['updatedAt'])
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
+        return with_etag(jsonify({'user': user.to_dict()}), etag), 200
         
     except Exception as e:
         current_app.logger.error(f"Get profile error: {e}")
@@ -71,16 +80,30 @@ def update_profile():
             return jsonify({'message': 'User not found'}), 404
         
         # Allowed fields for update
-        allowed_fields = ['name', 'preferences', 'photo']
+        allowed_fields = ['name', 'preferences']
         update_data = {}
         
         for field in allowed_fields:
             if field in data:
                 update_data[field] = data[field]
         
+        # A data URL goes to the photo store like an upload; anything else is an external URL (or None)
+        photo = data.get('photo')
+        uploaded_photo = None
+        if isinstance(photo, str) and photo.startswith('data:'):
+            try:
+                uploaded_photo = PhotoStore.decode_data_url(photo)
+            except ValueError as e:
+                return jsonify({'message': str(e)}), 400
+        
         if update_data:
             user.update(update_data)
         
+        if uploaded_photo:
+            user.set_photo(PhotoStore.save(*uploaded_photo))
+        elif 'photo' in data:
+            user.set_photo(None, photo)
+        
         return jsonify({
             'message': 'Profile updated successfully',
             'user': user.to_dict()
@@ -99,31 +122,18 @@ def upload_photo():
         if not data or 'photo' not in data:
             return jsonify({'message': 'No photo data provided'}), 400
         
-        photo_data = data['photo']
-        
-        # Validate base64 format
-        if not photo_data.startswith('data:image/'):
-            return jsonify({'message': 'Invalid photo format'}), 400
-        
-        # Extract base64 data
+        # Validate the base64 data URL (format and 5MB limit)
         try:
-            header, base64_data = photo_data.split(',', 1)
-            photo_bytes = base64.b64decode(base64_data)
-        except Exception:
-            return jsonify({'message': 'Invalid base64 photo data'}), 400
-        
-        # Validate file size (5MB limit)
-        max_size = 5 * 1024 * 1024  # 5MB
-        if len(photo_bytes) > max_size:
-            return jsonify({'message': 'Photo size exceeds 5MB limit'}), 400
+            content_type, photo_bytes = PhotoStore.decode_data_url(data['photo'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         user = User.find_by_id(get_jwt_identity())
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
-        # In a production environment, you would upload to a cloud storage service
-        # For now, we'll store the base64 data directly
-        user.update({'photo': photo_data})
+        # Stored with its thumbnails in GridFS; the user document only keeps the ID
+        user.set_photo(PhotoStore.save(content_type, photo_bytes))
         
         return jsonify({
             'message': 'Photo uploaded successfully',
@@ -133,3 +143,30 @@ def upload_photo():
     except Exception as e:
         current_app.logger.error(f"Upload photo error: {e}")
         return jsonify({'message': 'Failed to upload photo'}), 500
+
+@user_bp.route('/photos/<photo_id>', defaults={'size': ORIGINAL_SIZE}, methods=['GET'])
+@user_bp.route('/photos/<photo_id>/<size>', methods=['GET'])
+def get_photo(photo_id, size):
+    """Serve a stored photo; URLs are content-addressed, so responses never change"""
+    try:
+        if size != ORIGINAL_SIZE and size not in PHOTO_SIZES:
+            return jsonify({'message': 'Unknown photo size'}), 404
+        
+        photo = PhotoStore.open(photo_id, size)
+        if not photo:
+            return jsonify({'message': 'Photo not found'}), 404
+        
+        content_type, photo_bytes = photo
+        response = current_app.response_class(photo_bytes, mimetype=content_type)
+        response.set_etag(f"{photo_id}-{size}")
+        response.cache_control.public = True
+        response.cache_control.max_age = PHOTO_CACHE_MAX_AGE
+        response.cache_control.immutable = True
+        # Uploads keep their own image type (SVG included), so never let them run as a page
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.headers['Content-Security-Policy'] = "default-src 'none'; sandbox"
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        current_app.logger.error(f"Get photo error: {e}")
+        return jsonify({'message': 'Failed to get photo'}), 500